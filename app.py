@@ -7,8 +7,19 @@ from pathlib import Path
 import subprocess
 import platform
 import json
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Dict, List, Tuple
+import multiprocessing
+from typing import Dict, List, Optional, Tuple
+
+from scanner import (ScanNode, ScanProfile, ParallelScanner, ProcessScanner, find_node, replace_node,
+                     rescan_directory, iter_directories, estimate_tree_bytes, diff_trees, remove_node,
+                     scan_tree)
+from watcher import create_watcher
+from cache_store import MemoryCache, merge_largest_files, open_cache_store
+from dupes import DuplicateFinder
+from jobs import CompressJob, DeleteJob, Job, JobQueue, MoveJob
+
+# Reference point for the startup time shown in the status bar
+APP_START_TIME = time.perf_counter()
 
 class StorageManager:
     def __init__(self, root):
@@ -28,14 +39,34 @@ class StorageManager:
         self.scanning = False
         self.scan_thread = None
         self.cancel_scan = False
+        self.closing = False  # Set by on_close, which keeps a running scan itself
 
         # Navigation history
         self.navigation_history = ["C:\\"]
         self.history_index = 0
         self.max_history = 50
 
-        # Data storage
-        self.folder_data = []
+        # Data storage: child nodes of the folder shown, formatted only when displayed
+        self.folder_data: List[ScanNode] = []
+        self.folder_data_path = ""
+
+        # Rows are inserted a page at a time as the table is scrolled, so
+        # opening a folder with huge numbers of subfolders stays fast
+        self.row_page_size = 200
+        self.rows_loaded = 0
+        self.loading_rows = False
+
+        # Scan progress is polled from the running scanner at about 15 Hz
+        self.active_scanner = None
+        # Deletes, moves and compressions run in the background, two at a time
+        self.job_queue = JobQueue(max_running=2)
+        self.jobs_window = None
+        self.jobs_tree = None
+        self.progress_interval_ms = 66
+
+        # Rows are updated from the running scan twice a second
+        self.partial_update_interval = 0.5
+        self.last_partial_update = 0.0
 
         # Detailed progress tracking
         self.current_scan_folder = tk.StringVar(value="")
@@ -44,18 +75,40 @@ class StorageManager:
 
         # Persistent cache configuration
         self.cache_dir = Path.home() / ".helium_cache"
-        self.cache_file = self.cache_dir / "scan_cache.json"
-        self.scan_cache = {}  # path -> {folders: [], timestamp: float, total_size: int, subdirs_count: int}
+        self.cache_store = None  # CacheStore holding every entry on disk
+        # Entries loaded so far: path -> {tree: ScanNode, timestamp: float, total_size: int, subdirs_count: int}
+        self.scan_cache = MemoryCache(on_evict=self.on_cache_evict)
+        self.cache_max_entries = 500  # Locations kept in memory
+        self.cache_max_memory_mb = 512  # Memory budget for loaded trees
+        self.dirty_cache_paths = set()  # Entries changed since the last save
+        self.cache_ready = threading.Event()  # Set once the cache store is open
         self.cache_ttl = 3600  # Cache validity: 1 hour (in seconds)
         self.cache_enabled = True  # Toggle for cache usage
         self.max_workers = 4  # Number of parallel threads for scanning
-
-        # Load cache and settings
+        self.scan_backend = 'threads'  # 'threads' or 'processes'
+        self.profile_scans = False  # Record per-phase timings, written to scan_profile.json
+        self.show_disk_usage = False  # Show allocated size next to apparent size
+        self.max_snapshots = 10  # Scan history kept per scanned folder, 0 keeps none
+        self.checkpoint_minutes = 5  # Save a running scan this often so it can resume, 0 never
+        self.snapshot_compare = None  # {root, timestamp, tree, diff} while comparing with a snapshot
+        self.scan_profile = None
+
+        # Live updates from filesystem change notifications
+        self.live_updates = False
+        self.max_watched_dirs = 4096
+        self.watcher = None
+
+        # Load settings, the cache is opened in the background so the
+        # window does not wait for it
         self.load_settings()
-        self.load_cache_from_disk()
+        self.apply_cache_budget()
         
         self.create_widgets()
         self.center_window()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        self.window_ready_ms = (time.perf_counter() - APP_START_TIME) * 1000
+        threading.Thread(target=self.open_cache_in_background, daemon=True).start()
         
     def setup_styles(self):
         """Configure modern dark theme styles"""
@@ -168,6 +221,15 @@ class StorageManager:
 
         ttk.Button(action_frame, text="Export",
                   command=self.export_report, width=8).pack(side=tk.LEFT, padx=2)
+
+        ttk.Button(action_frame, text="Duplicates",
+                  command=self.find_duplicates, width=11).pack(side=tk.LEFT, padx=2)
+
+        ttk.Button(action_frame, text="History",
+                  command=self.show_history, width=8).pack(side=tk.LEFT, padx=2)
+
+        ttk.Button(action_frame, text="Jobs",
+                  command=self.show_jobs, width=6).pack(side=tk.LEFT, padx=2)
         
         # Right side info
         info_frame = ttk.Frame(toolbar)
@@ -233,8 +295,10 @@ class StorageManager:
         tree_frame.pack(fill=tk.BOTH, expand=True)
         
         # Create treeview
-        columns = ('Size (GB)', 'Size (MB)', 'Files', 'Modified', 'Path')
-        self.tree = ttk.Treeview(tree_frame, columns=columns, show='tree headings', height=20)
+        columns = ('Size (GB)', 'Size (MB)', 'Files', 'Modified', 'Path', 'On Disk (GB)', 'Change')
+        self.tree = ttk.Treeview(tree_frame, columns=columns, show='tree headings', height=20,
+                                 selectmode='extended')
+        self.apply_display_columns()
         
         # Configure columns
         self.tree.heading('#0', text='Folder Name', anchor='w')
@@ -254,17 +318,23 @@ class StorageManager:
         
         self.tree.heading('Path', text='Full Path', anchor='w')
         self.tree.column('Path', width=300, minwidth=200)
+
+        self.tree.heading('On Disk (GB)', text='On Disk (GB)', anchor='e')
+        self.tree.column('On Disk (GB)', width=100, minwidth=80, anchor='e')
+
+        self.tree.heading('Change', text='Change', anchor='e')
+        self.tree.column('Change', width=100, minwidth=80, anchor='e')
         
         # Scrollbars
-        v_scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscrollcommand=v_scrollbar.set)
+        self.v_scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.on_tree_scroll)
         
         h_scrollbar = ttk.Scrollbar(tree_frame, orient=tk.HORIZONTAL, command=self.tree.xview)
         self.tree.configure(xscrollcommand=h_scrollbar.set)
         
         # Pack treeview and scrollbars
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         h_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
         
         # Right panel - Details and charts
@@ -276,6 +346,9 @@ class StorageManager:
         # Bind events
         self.tree.bind('<Double-1>', self.on_item_double_click)
         self.tree.bind('<<TreeviewSelect>>', self.on_item_select)
+
+        # Configure tag for virtual files entry (gray, italic)
+        self.tree.tag_configure('files_entry', foreground='#888888', font=('Segoe UI', 10, 'italic'))
         
     def create_details_panel(self, parent):
         """Create details panel"""
@@ -315,8 +388,35 @@ class StorageManager:
         ttk.Button(action_frame, text="Delete",
                   command=self.delete_selected, width=15).pack(pady=2, fill=tk.X)
 
+        ttk.Button(action_frame, text="Move To...",
+                  command=self.move_selected, width=15).pack(pady=2, fill=tk.X)
+
+        ttk.Button(action_frame, text="Compress",
+                  command=self.compress_selected, width=15).pack(pady=2, fill=tk.X)
+
         ttk.Button(action_frame, text="Properties",
                   command=self.show_properties, width=15).pack(pady=2, fill=tk.X)
+
+        # Largest files of the current folder, collected during the scan
+        ttk.Label(parent, text="Largest Files",
+                 font=('Segoe UI', 12, 'bold')).pack(anchor='w', pady=(15, 5))
+
+        largest_frame = ttk.Frame(parent)
+        largest_frame.pack(fill=tk.BOTH, expand=True)
+
+        self.largest_tree = ttk.Treeview(largest_frame, columns=('Size (MB)', 'Path'),
+                                         show='headings', height=8)
+        self.largest_tree.heading('Size (MB)', text='Size (MB)', anchor='e')
+        self.largest_tree.column('Size (MB)', width=80, minwidth=60, anchor='e', stretch=False)
+        self.largest_tree.heading('Path', text='File', anchor='w')
+        self.largest_tree.column('Path', width=250, minwidth=150)
+
+        largest_scroll = ttk.Scrollbar(largest_frame, orient=tk.VERTICAL,
+                                       command=self.largest_tree.yview)
+        self.largest_tree.configure(yscrollcommand=largest_scroll.set)
+
+        self.largest_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        largest_scroll.pack(side=tk.RIGHT, fill=tk.Y)
         
     def create_status_bar(self, parent):
         """Create status bar with detailed progress panel"""
@@ -474,27 +574,104 @@ class StorageManager:
         current = Path(self.current_path.get())
         self.up_btn.configure(state='normal' if current.parent != current else 'disabled')
             
+    def find_cache_entry(self, path) -> Optional[Tuple[Dict, Optional[ScanNode]]]:
+        """
+        Find the cache entry covering path: its own entry, or the tree of a
+        scanned ancestor so drill-down at any depth needs no re-walk
+        Returns: (cache_entry, node) or None
+        """
+        cache_entry = self.get_cache_entry(path)
+        if cache_entry is not None:
+            return cache_entry, cache_entry['tree']
+
+        for parent in Path(path).parents:
+            cache_entry = self.get_cache_entry(str(parent))
+            if cache_entry is not None:
+                node = find_node(cache_entry['tree'], str(parent), path)
+                if node is not None:
+                    return cache_entry, node
+
+        return None
+
+    def get_cache_entry(self, path) -> Optional[Dict]:
+        """Return the cache entry for path, reading it from disk on first use"""
+        cache_entry = self.scan_cache.get(path)
+        if cache_entry is None and self.cache_store is not None:
+            try:
+                cache_entry = self.cache_store.get(path)
+            except Exception as e:
+                print(f"Failed to read cache entry: {e}")
+                return None
+            if cache_entry is not None:
+                self.scan_cache[path] = cache_entry
+        return cache_entry
+
     def is_cache_valid(self, path):
-        """Check if cache exists and is still valid for given path"""
-        if path not in self.scan_cache:
+        """
+        Check if cache exists and is still valid for given path
+        Besides the age limit, the folder itself must not have changed; its
+        subfolders are checked by check_subfolders, off the UI thread.
+        The partial tree of a cancelled scan is never valid, only resumed
+        """
+        found = self.find_cache_entry(path)
+        if found is None:
             return False
 
-        cache_entry = self.scan_cache[path]
+        cache_entry, node = found
+        if cache_entry.get('incomplete'):
+            return False
         cache_age = time.time() - cache_entry['timestamp']
+        if cache_age >= self.cache_ttl:
+            return False
+
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        return node.mtime == st.st_mtime and node.ino == st.st_ino
 
-        return cache_age < self.cache_ttl
+    def check_subfolders(self, path, node: ScanNode):
+        """
+        Runs on a thread: one stat per subfolder of a valid cache entry, which
+        catches files added or removed a level down. Changes deeper down do
+        not touch these mtimes, so they only show after the validity period
+        or a refresh
+        """
+        unchanged = True
+        for child in list(node.children):
+            try:
+                st = os.stat(os.path.join(path, child.name), follow_symlinks=False)
+            except OSError:
+                unchanged = False
+                break
+            if child.mtime != st.st_mtime or child.ino != st.st_ino:
+                unchanged = False
+                break
+        if not self.closing:
+            self.root.after(0, lambda: self.finish_subfolder_check(path, unchanged))
+
+    def finish_subfolder_check(self, path, unchanged):
+        """Show the cached folder, or scan what changed in it"""
+        if self.scanning or self.current_path.get() != path:
+            return  # the user went on elsewhere meanwhile
+        if unchanged:
+            self.load_from_cache(path)
+        else:
+            self.start_scan(force_refresh=True)
 
     def load_from_cache(self, path):
         """Load scan results from cache"""
-        cache_entry = self.scan_cache[path]
-        self.folder_data = cache_entry['folders']
+        cache_entry, node = self.find_cache_entry(path)
+        self.folder_data = node.children
+        self.folder_data_path = path
+        total_size = node.size
 
         # Update UI
-        self.clear_tree()
         self.populate_tree()
+        self.show_largest_files()
 
-        total_gb = round(cache_entry['total_size'] / (1024**3), 2)
-        total_mb = round(cache_entry['total_size'] / (1024**2), 2)
+        total_gb = round(total_size / (1024**3), 2)
+        total_mb = round(total_size / (1024**2), 2)
 
         # Display with appropriate unit
         if total_gb >= 1:
@@ -502,6 +679,8 @@ class StorageManager:
         else:
             size_str = f"{total_mb} MB"
 
+        if self.show_disk_usage:
+            size_str += f" ({round(node.alloc / (1024**3), 2)} GB on disk)"
         self.total_size.set(f"Total: {size_str}")
 
         cache_age_minutes = int((time.time() - cache_entry['timestamp']) / 60)
@@ -516,8 +695,9 @@ class StorageManager:
         # Show subfolder count
         num_folders = len(self.folder_data)
         self.status_text.set(f"⚡ Instant load from cache - {num_folders} subfolders ({age_str})")
-        self.scan_stats.set(f"Cache hit! Loaded {num_folders} subfolders instantly | Total: {size_str} | Cached size: {cache_entry['total_size']:,} bytes")
+        self.scan_stats.set(f"Cache hit! Loaded {num_folders} subfolders instantly | Total: {size_str} | Cached size: {total_size:,} bytes")
         self.update_cache_info()
+        self.start_watching(path)
 
     def start_scan(self, force_refresh=False):
         """Start directory scan in separate thread"""
@@ -530,21 +710,49 @@ class StorageManager:
             messagebox.showerror("Error", "Directory does not exist!")
             return
 
+        # Wait for the cache store instead of scanning without it
+        if not self.cache_ready.is_set():
+            self.status_text.set("Opening cache...")
+            self.root.after(100, lambda: self.start_scan(force_refresh))
+            return
+
         # Update navigation buttons
         self.update_navigation_buttons()
 
         # Check cache first (unless force refresh)
+        # A folder can have many subfolders, which are checked off the UI thread
         if not force_refresh and self.cache_enabled and self.is_cache_valid(path):
-            self.load_from_cache(path)
+            node = self.find_cache_entry(path)[1]
+            threading.Thread(target=self.check_subfolders, args=(path, node), daemon=True).start()
             return
 
+        # A scan could see a job's folders half changed, other folders are fine
+        if any(job.touches(path) for job in self.job_queue.active()):
+            messagebox.showinfo("Jobs in Progress",
+                                "Please wait for the jobs working in this folder to finish.")
+            return
+
+        # An outdated tree still lets the scan skip folders that did not change
+        previous = None
+        previous_largest = []
+        found = self.find_cache_entry(path) if self.cache_enabled else None
+        if found is not None:
+            previous = found[1]
+            previous_largest = self.largest_files_under(path)
+
+        self.stop_watching()
         self.scanning = True
-        self.scan_thread = threading.Thread(target=self.scan_directory, args=(path,))
+        self.scan_thread = threading.Thread(target=self.scan_directory,
+                                            args=(path, previous, previous_largest))
         self.scan_thread.daemon = True
         self.scan_thread.start()
 
-    def scan_directory(self, path):
-        """Scan directory with parallel processing for better performance"""
+    def scan_directory(self, path, previous: Optional[ScanNode] = None, previous_largest=()):
+        """
+        Scan directory with parallel processing for better performance
+        With a previous tree only folders whose listing changed are re-read,
+        previous_largest carries over the largest files found in the others
+        """
         try:
             self.status_text.set("Initializing scan...")
             self.scan_progress.set(0)
@@ -553,263 +761,447 @@ class StorageManager:
             # Enable cancel button
             self.root.after(0, lambda: self.cancel_btn.config(state='normal'))
 
-            # Clear existing data
+            # Clear existing data, rows come back as the scan finds them
             self.root.after(0, self.clear_tree)
+            self.root.after(0, lambda: self.largest_tree.delete(*self.largest_tree.get_children()))
 
-            # Get subdirectories
-            subdirs = [d for d in Path(path).iterdir() if d.is_dir()]
-            total_dirs = len(subdirs)
-
-            if total_dirs == 0:
-                self.root.after(0, lambda: self.status_text.set("No subdirectories found"))
-                self.scanning = False
-                self.root.after(0, lambda: self.cancel_btn.config(state='disabled'))
-                return
-
-            self.folder_data = []
-            total_size_bytes = 0
-            completed = 0
             start_time = time.time()
-
-            self.root.after(0, lambda: self.status_text.set(f"Scanning {total_dirs} folders..."))
-
-            # Parallel scanning with ThreadPoolExecutor
-            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                # Submit all folder scan tasks
-                future_to_folder = {
-                    executor.submit(self.scan_single_folder, subdir, i, total_dirs): subdir
-                    for i, subdir in enumerate(subdirs)
-                }
-
-                # Process completed scans as they finish
-                for future in as_completed(future_to_folder):
-                    if self.cancel_scan:
-                        # Cancel remaining tasks
-                        for f in future_to_folder:
-                            f.cancel()
-                        self.root.after(0, lambda: self.status_text.set("⏹ Scan cancelled"))
-                        break
-
-                    folder_info = future.result()
-                    if folder_info:
-                        self.folder_data.append(folder_info)
-                        total_size_bytes += folder_info['size_bytes']
-
-                    completed += 1
-
-                    # Update progress
-                    progress = (completed / total_dirs) * 100
-                    self.root.after(0, lambda p=progress: self.scan_progress.set(p))
-
-                    # Calculate stats
-                    elapsed = time.time() - start_time
-                    rate = completed / elapsed if elapsed > 0 else 0
-                    eta = (total_dirs - completed) / rate if rate > 0 else 0
-
-                    stats = (f"Progress: {completed}/{total_dirs} | "
-                            f"Speed: {rate:.1f} folders/sec | "
-                            f"ETA: {int(eta)}s | "
-                            f"Total: {total_size_bytes/(1024**3):.2f} GB")
-
-                    self.root.after(0, lambda s=stats: self.scan_stats.set(s))
-                    self.root.after(0, lambda c=completed, t=total_dirs:
-                                   self.status_text.set(f"Scanning... {c}/{t}"))
-
-            if not self.cancel_scan:
-                # Sort by size (descending)
-                self.folder_data.sort(key=lambda x: x['size_bytes'], reverse=True)
-
-                # Store in cache
-                self.scan_cache[path] = {
-                    'folders': self.folder_data.copy(),
-                    'timestamp': time.time(),
-                    'total_size': total_size_bytes,
-                    'subdirs_count': len(self.folder_data)
-                }
+            self.root.after(0, lambda: self.status_text.set("Scanning..."))
+
+            # Workers share one queue of directories, so big subfolders are
+            # split across all threads instead of being walked by one.
+            # The process backend walks whole subtrees outside the GIL.
+            # Refreshes are mostly stat calls, so they always use threads.
+            profile = ScanProfile() if self.profile_scans else None
+            self.scan_profile = profile
+            if previous is not None:
+                scanner = ParallelScanner(path, self.max_workers, previous, profile)
+            elif self.scan_backend == 'processes':
+                scanner = ProcessScanner(path, self.max_workers, profile)
+            else:
+                scanner = ParallelScanner(path, self.max_workers, profile=profile)
+            scanner.largest_files.seed(previous_largest)
+            scanner.start()
+
+            # The Tk thread polls the scanner for progress at a fixed rate,
+            # nothing is posted to it per directory
+            self.active_scanner = scanner
+            self.root.after(0, self.poll_scan_progress)
+
+            checkpoint_interval = self.checkpoint_minutes * 60
+            last_checkpoint = time.monotonic()
+            while not scanner.wait(0.2):
+                if self.cancel_scan:
+                    # Workers stop after the folders they are listing
+                    scanner.cancel()
+                    scanner.wait()
+                    break
+                if self.cache_enabled and checkpoint_interval > 0 and \
+                        time.monotonic() - last_checkpoint >= checkpoint_interval:
+                    self.save_scan_checkpoint(scanner)
+                    last_checkpoint = time.monotonic()
+            self.active_scanner = None
+
+            if self.closing:
+                return
+            if not scanner.complete:
+                # Keep what was scanned so the next scan of path resumes from it
+                if self.cache_enabled:
+                    self.store_partial_result(path, scanner.root, scanner.largest_files.items())
+                    self.save_cache_to_disk()
+                    self.root.after(0, self.update_cache_info)
+                status = f"⏹ Scan cancelled - {scanner.dirs_scanned:,} folders scanned"
+                if self.cache_enabled:
+                    status += ", the next scan continues from there"
+                self.root.after(0, lambda: self.status_text.set(status))
+            else:
+                root_node = scanner.root
+                num_folders = len(root_node.children)
+
+                # Store the whole tree in cache
+                cache_started = time.perf_counter()
+                self.store_scan_result(path, root_node, scanner.largest_files.items())
 
                 # Save cache to disk
                 self.save_cache_to_disk()
+                self.save_snapshot(path, root_node)
+                if profile is not None:
+                    profile.add('cache_write', time.perf_counter() - cache_started)
 
                 # Update UI
-                total_gb = round(total_size_bytes / (1024**3), 2)
+                total_gb = round(root_node.size / (1024**3), 2)
                 elapsed_time = time.time() - start_time
-                self.root.after(0, lambda: self.total_size.set(f"Total: {total_gb} GB"))
-                self.root.after(0, self.populate_tree)
-                self.root.after(0, lambda: self.status_text.set(
-                    f"✓ Scan complete - {len(self.folder_data)} folders in {elapsed_time:.1f}s"))
+                if num_folders:
+                    status = f"✓ Scan complete - {num_folders} folders in {elapsed_time:.1f}s"
+                    if previous is not None:
+                        status += f" ({scanner.dirs_reused:,} of {scanner.dirs_scanned:,} folders unchanged)"
+                    if scanner.skipped.total:
+                        status += f" ({scanner.skipped.total:,} skipped)"
+                else:
+                    status = "No subdirectories found"
+                self.root.after(0, lambda: self.total_size.set(self.total_size_text(root_node)))
+                self.root.after(0, lambda: self.show_scan_result(path, root_node))
+                self.root.after(0, lambda: self.status_text.set(status))
                 self.root.after(0, self.update_cache_info)
+                self.root.after(0, lambda: self.start_watching(path))
                 self.root.after(0, lambda: self.scan_stats.set(
-                    f"Completed: {len(self.folder_data)} folders | Total: {total_gb} GB | Time: {elapsed_time:.1f}s"))
+                    f"Completed: {num_folders} folders | Total: {total_gb} GB | Time: {elapsed_time:.1f}s\n"
+                    f"Scanned {scanner.dirs_scanned:,} directories | {scanner.utilization_summary()}\n"
+                    f"{scanner.skipped.summary()}"))
+                if profile is not None:
+                    self.root.after(0, lambda: self.report_scan_profile(profile))
 
         except Exception as e:
             self.root.after(0, lambda e=e: messagebox.showerror("Error", f"Scan failed: {str(e)}"))
         finally:
+            self.active_scanner = None
             self.scanning = False
             self.cancel_scan = False
-            self.root.after(0, lambda: self.scan_progress.set(0))
-            self.root.after(0, lambda: self.cancel_btn.config(state='disabled'))
-            self.root.after(0, lambda: self.current_scan_folder.set(""))
+            if not self.closing:
+                if not self.job_queue.active():
+                    self.root.after(0, lambda: self.scan_progress.set(0))
+                    self.root.after(0, lambda: self.cancel_btn.config(state='disabled'))
+                self.root.after(0, lambda: self.current_scan_folder.set(""))
     
-    def get_folder_size_and_count(self, folder_path: Path) -> Tuple[int, int]:
+    def poll_scan_progress(self):
+        """Show the running scan's progress, repeats until the scan ends"""
+        scanner = self.active_scanner
+        if scanner is None:
+            return
+
+        started = time.perf_counter()
+        progress = scanner.progress()
+        self.scan_progress.set(progress.percent)
+        stats = (f"Progress: {progress.top_level_done}/{progress.top_level_total} | "
+                 f"Speed: {progress.dirs_per_second:.1f} folders/sec | "
+                 f"ETA: {int(progress.eta)}s | "
+                 f"Total: {progress.bytes_seen/(1024**3):.2f} GB\n"
+                 f"{scanner.utilization_summary()}")
+        if scanner.profile is not None:
+            stats += "\n" + scanner.profile.summary()
+        self.scan_stats.set(stats)
+        current = os.path.relpath(progress.current_path, scanner.path) if progress.current_path else ""
+        self.current_scan_folder.set(current)
+        self.status_text.set(f"Scanning... {progress.top_level_done}/{progress.top_level_total}")
+
+        now = time.monotonic()
+        if now - self.last_partial_update >= self.partial_update_interval:
+            self.last_partial_update = now
+            self.show_partial_results(scanner)
+        if scanner.profile is not None:
+            scanner.profile.add('ui_update', time.perf_counter() - started)
+
+        self.root.after(self.progress_interval_ms, self.poll_scan_progress)
+
+    def show_partial_results(self, scanner):
+        """Show top-level folders with their sizes so far, re-sorted, while scanning"""
+        if os.path.normpath(self.current_path.get()) != os.path.normpath(scanner.path):
+            return
+        self.folder_data = [ScanNode(node.name, size, files, node.mtime, alloc=node.alloc)
+                            for node, size, files in scanner.partial_results()]
+        self.folder_data_path = scanner.path
+        self.sync_rows(show_files_entry=False)
+
+    def show_scan_result(self, path, node: ScanNode):
+        """Replace the partial rows with the finished scan"""
+        started = time.perf_counter()
+        self.folder_data = node.children
+        self.folder_data_path = path
+        self.update_snapshot_diff()
+        self.sync_rows()
+        self.show_largest_files()
+        if self.scan_profile is not None:
+            self.scan_profile.add('ui_update', time.perf_counter() - started)
+
+    def report_scan_profile(self, profile: ScanProfile):
+        """Add scan timings to the progress details and write them to a file"""
+        profile_file = self.cache_dir / "scan_profile.json"
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            profile.dump(str(profile_file))
+            saved = f"Profile saved to {profile_file}"
+        except OSError as e:
+            saved = f"Failed to save profile: {e}"
+        self.scan_stats.set(f"{self.scan_stats.get()}\n{profile.summary()}\n{saved}")
+
+    def folder_row_values(self, node: ScanNode) -> Tuple:
+        """Format a scanned node as table values: GB, MB, files, modified, path, GB on disk, change"""
+        folder_path = str(Path(self.folder_data_path) / node.name)
+        return (round(node.size / (1024**3), 3),
+                round(node.size / (1024**2), 1),
+                node.files,
+                time.strftime('%Y-%m-%d %H:%M', time.localtime(node.mtime)),
+                folder_path,
+                round(node.alloc / (1024**3), 3),
+                self.change_text(folder_path))
+
+    def apply_display_columns(self):
+        """Show the optional on-disk and change columns, row values keep the same order"""
+        columns = ['Size (GB)', 'Size (MB)', 'Files', 'Modified', 'Path']
+        if self.snapshot_compare is not None:
+            columns.insert(1, 'Change')
+        if self.show_disk_usage:
+            columns.insert(1, 'On Disk (GB)')
+        self.tree.configure(displaycolumns=columns)
+
+    def update_snapshot_diff(self):
+        """Compare the snapshot being compared with against the current cached tree again"""
+        compare = self.snapshot_compare
+        if compare is None:
+            return
+        cache_entry = self.get_cache_entry(compare['root'])
+        if cache_entry is not None:
+            compare['diff'] = diff_trees(compare['tree'], cache_entry['tree'])
+
+    def change_text(self, folder_path) -> str:
+        """Growth of a folder since the snapshot being compared with, '' if not comparing"""
+        compare = self.snapshot_compare
+        if compare is None:
+            return ''
+        try:
+            relative = Path(folder_path).relative_to(Path(compare['root']))
+        except ValueError:
+            return ''
+        change = compare['diff'].change(str(relative) if relative.parts else '')
+        if change is None:
+            return 'new'
+        return format_size_change(change[0])
+
+    def total_size_text(self, node: ScanNode) -> str:
+        """Total label for a scanned folder, with its on-disk size when shown"""
+        text = f"Total: {round(node.size / (1024**3), 2)} GB"
+        if self.show_disk_usage:
+            text += f" ({round(node.alloc / (1024**3), 2)} GB on disk)"
+        return text
+
+    def store_scan_result(self, path, node: ScanNode, largest_files):
+        """Cache a freshly scanned tree and graft it into cached ancestor trees"""
+        # Older entries below this path are covered by the new tree
+        for cached_path in list(self.scan_cache):
+            if Path(path) in Path(cached_path).parents:
+                del self.scan_cache[cached_path]
+                self.dirty_cache_paths.discard(cached_path)
+        if self.cache_store is not None:
+            self.cache_store.delete_under(path)
+
+        self.graft_into_ancestors(path, node, largest_files)
+
+        self.scan_cache[path] = {
+            'tree': node,
+            'timestamp': time.time(),
+            'total_size': node.size,
+            'subdirs_count': len(node.children),
+            'largest_files': largest_files
+        }
+        self.dirty_cache_paths.add(path)
+
+    def store_partial_result(self, path, node: ScanNode, largest_files):
         """
-        Optimized: Calculate total size and file count in single pass using os.scandir
-        Includes hidden files and folders
-        Returns: (total_size_bytes, file_count)
+        Cache the tree of a cancelled or unfinished scan, marked incomplete
+        It is not shown as a result or grafted into ancestors, only used as
+        the previous tree when path is scanned again
         """
-        total_size = 0
-        file_count = 0
+        self.scan_cache[path] = {
+            'tree': node,
+            'timestamp': time.time(),
+            'total_size': node.size,
+            'subdirs_count': len(node.children),
+            'largest_files': largest_files,
+            'incomplete': True
+        }
+        self.dirty_cache_paths.add(path)
+
+    def save_scan_checkpoint(self, scanner):
+        """
+        Write the part of a running scan that is finished to disk, so the
+        next scan of the folder resumes from it after a crash or close
+        """
+        started = time.perf_counter()
+        node = scanner.checkpoint()
+        if node is None:
+            return
+        self.store_partial_result(scanner.path, node, scanner.largest_files.items())
+        self.save_cache_to_disk()
+        if scanner.profile is not None:
+            scanner.profile.add('cache_write', time.perf_counter() - started)
 
-        try:
-            # Use os.scandir for better performance than rglob
-            # Note: os.scandir includes hidden files/folders by default
-            def scan_recursive(path):
-                nonlocal total_size, file_count
-                try:
-                    with os.scandir(path) as entries:
-                        for entry in entries:
-                            try:
-                                # Skip . and .. but include hidden files (starting with .)
-                                if entry.name in ('.', '..'):
-                                    continue
-
-                                if entry.is_file(follow_symlinks=False):
-                                    total_size += entry.stat(follow_symlinks=False).st_size
-                                    file_count += 1
-                                elif entry.is_dir(follow_symlinks=False):
-                                    scan_recursive(entry.path)
-                            except (OSError, PermissionError):
-                                continue
-                except (OSError, PermissionError):
-                    pass
+    def graft_into_ancestors(self, path, node: ScanNode, largest_files=None):
+        """
+        Keep ancestor trees consistent so navigating up shows fresh sizes
+        Each ancestor gets its own copy: entries must not share nodes, or a
+        later patch through one entry would leave the others' totals stale
+        """
+        node_bytes = None
+        for parent in Path(path).parents:
+            cache_entry = self.get_cache_entry(str(parent))
+            if cache_entry is not None:
+                old_node = replace_node(cache_entry['tree'], str(parent), path, node.copy())
+                if old_node is not None:
+                    cache_entry['total_size'] = cache_entry['tree'].size
+                    if largest_files is not None:
+                        cache_entry['largest_files'] = merge_largest_files(
+                            cache_entry.get('largest_files', []), path, largest_files)
+                    self.dirty_cache_paths.add(str(parent))
+                    if node_bytes is None:
+                        node_bytes = estimate_tree_bytes(node)
+                    self.scan_cache.adjust(str(parent), node_bytes - estimate_tree_bytes(old_node))
+
+    def largest_files_under(self, path):
+        """Cached largest files inside path, from its own or an ancestor's scan"""
+        found = self.find_cache_entry(path)
+        if found is None:
+            return []
+        prefix = path.rstrip('/\\') + os.sep
+        return [item for item in found[0].get('largest_files', []) if item[1].startswith(prefix)]
+
+    def show_largest_files(self):
+        """List the largest files of the current folder in the side panel"""
+        self.largest_tree.delete(*self.largest_tree.get_children())
+        for size, file_path in self.largest_files_under(self.current_path.get()):
+            self.largest_tree.insert('', tk.END, values=(f"{size / (1024**2):,.1f}", file_path))
+
+    def start_watching(self, path):
+        """Watch the browsed folder so the table follows changes on disk"""
+        self.stop_watching()
+        if not self.live_updates:
+            return
 
-            scan_recursive(str(folder_path))
-        except (OSError, PermissionError):
-            pass
+        found = self.find_cache_entry(path)
+        if found is None or found[1] is None:
+            return
 
-        return total_size, file_count
+        self.watcher = create_watcher(self.on_watched_change)
+        self.watcher.watch(iter_directories(found[1], path, self.max_watched_dirs))
 
-    def get_folder_info_with_subdirs(self, folder_path: Path) -> Tuple[int, int, List[Dict]]:
-        """
-        Enhanced: Calculate size, count AND collect info about direct subdirectories
-        This enables instant drill-down by pre-caching nested folder info
-        Returns: (total_size_bytes, file_count, subdirs_info_list)
-        """
-        total_size = 0
-        file_count = 0
-        subdirs_info = []
+    def stop_watching(self):
+        """Stop live updates for the previously browsed folder"""
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
 
-        try:
-            # First, scan direct subdirectories and collect their info
-            direct_subdirs = []
-            try:
-                with os.scandir(str(folder_path)) as entries:
-                    for entry in entries:
-                        try:
-                            if entry.is_dir(follow_symlinks=False):
-                                direct_subdirs.append(Path(entry.path))
-                        except (OSError, PermissionError):
-                            continue
-            except (OSError, PermissionError):
-                pass
-
-            # Now calculate size for each subdirectory
-            for subdir in direct_subdirs:
-                try:
-                    subdir_size, subdir_files = self.get_folder_size_and_count(subdir)
-                    modified_time = subdir.stat().st_mtime
-
-                    subdir_info = {
-                        'name': subdir.name,
-                        'size_gb': round(subdir_size / (1024**3), 3),
-                        'size_mb': round(subdir_size / (1024**2), 1),
-                        'files': subdir_files,
-                        'modified': time.strftime('%Y-%m-%d %H:%M', time.localtime(modified_time)),
-                        'path': str(subdir),
-                        'size_bytes': subdir_size
-                    }
-
-                    subdirs_info.append(subdir_info)
-                    total_size += subdir_size
-                    file_count += subdir_files
-                except (OSError, PermissionError):
-                    continue
-
-            # Also count files in the root of this folder
-            try:
-                with os.scandir(str(folder_path)) as entries:
-                    for entry in entries:
-                        try:
-                            if entry.is_file(follow_symlinks=False):
-                                total_size += entry.stat(follow_symlinks=False).st_size
-                                file_count += 1
-                        except (OSError, PermissionError):
-                            continue
-            except (OSError, PermissionError):
-                pass
-
-            # Sort subdirs by size
-            subdirs_info.sort(key=lambda x: x['size_bytes'], reverse=True)
-
-        except (OSError, PermissionError):
-            pass
-
-        return total_size, file_count, subdirs_info
-
-    def scan_single_folder(self, subdir: Path, index: int, total: int) -> Dict:
+    def on_watched_change(self, changed_dirs):
         """
-        Scan a single folder and return its info
-        This is designed to be called in parallel
-        Also caches nested subdirectories for instant drill-down
+        Called from the watcher thread with a coalesced batch of changed folders
+        Re-lists them off the UI thread, then hands the new nodes to the UI
         """
-        try:
-            # Update progress in UI
-            folder_name = subdir.name
-            self.root.after(0, lambda: self.current_scan_folder.set(f"{folder_name} ({index+1}/{total})"))
-
-            # Calculate size and count, AND collect subdirectory info
-            size_bytes, file_count, nested_folders = self.get_folder_info_with_subdirs(subdir)
-            modified_time = subdir.stat().st_mtime
-
-            folder_info = {
-                'name': subdir.name,
-                'size_gb': round(size_bytes / (1024**3), 3),
-                'size_mb': round(size_bytes / (1024**2), 1),
-                'files': file_count,
-                'modified': time.strftime('%Y-%m-%d %H:%M', time.localtime(modified_time)),
-                'path': str(subdir),
-                'size_bytes': size_bytes
-            }
+        patches = []
+        for dir_path in changed_dirs:
+            found = self.find_cache_entry(dir_path)
+            if found is None or found[1] is None:
+                continue  # New folder, walked as part of its parent's patch
+            node = rescan_directory(dir_path, found[1])
+            if node is not None:
+                patches.append((dir_path, node))
+
+        if patches:
+            self.root.after(0, lambda: self.apply_watched_changes(patches))
+
+    def apply_watched_changes(self, patches):
+        """Patch the cached trees and the open table rows in place"""
+        if self.scanning or self.watcher is None:
+            return  # A running scan replaces this data anyway
+
+        # Parents first, so patches of their subfolders land in the new parent
+        for dir_path, node in patches:
+            self.patch_cached_tree(dir_path, node)
+            self.watcher.watch(str(Path(dir_path) / child.name) for child in node.children)
+
+        self.refresh_visible_rows()
+        self.update_cache_info()
+        self.status_text.set(f"↻ Live update: {len(patches)} changed folder(s) applied")
+
+    def patch_cached_tree(self, dir_path, node: ScanNode):
+        """Replace the cached tree of one folder, in its own entry and its ancestors'"""
+        cache_entry = self.get_cache_entry(dir_path)
+        if cache_entry is not None:
+            cache_entry['tree'] = node
+            cache_entry['total_size'] = node.size
+            cache_entry['subdirs_count'] = len(node.children)
+            self.scan_cache[dir_path] = cache_entry
+            self.dirty_cache_paths.add(dir_path)
+        self.graft_into_ancestors(dir_path, node)
+
+    def refresh_visible_rows(self):
+        """Update, add, remove and reorder table rows from the cached tree"""
+        path = self.current_path.get()
+        found = self.find_cache_entry(path)
+        if found is None or found[1] is None:
+            return
 
-            # Cache the nested subdirectories so drill-down is instant!
-            # ALWAYS cache, even if no subfolders (could have files only)
-            subdir_path = str(subdir)
-            self.scan_cache[subdir_path] = {
-                'folders': nested_folders,  # Can be empty list if no subdirs
-                'timestamp': time.time(),
-                'total_size': size_bytes,  # Total size of THIS folder (all files recursively)
-                'subdirs_count': len(nested_folders)
-            }
+        node = found[1]
+        self.folder_data = node.children
+        self.folder_data_path = path
+        self.sync_rows()
+        self.total_size.set(self.total_size_text(node))
 
-            return folder_info
+    def sync_rows(self, show_files_entry=True):
+        """Update, add, remove and reorder table rows to match folder_data"""
+        rows = {}
+        for item in self.tree.get_children():
+            if 'files_entry' in self.tree.item(item, 'tags'):
+                self.tree.delete(item)
+            else:
+                rows[str(self.tree.item(item, 'values')[4])] = item
+
+        # Only rows already paged in are kept up to date
+        visible = self.folder_data[:max(self.rows_loaded, self.row_page_size)]
+        self.rows_loaded = len(visible)
+        for index, folder in enumerate(visible):
+            values = self.folder_row_values(folder)
+            item = rows.pop(values[4], None)
+            if item is None:
+                self.tree.insert('', index, text=folder.name, values=values)
+            else:
+                self.tree.item(item, values=values)
+                self.tree.move(item, '', index)
+
+        for item in rows.values():
+            self.tree.delete(item)
+
+        if show_files_entry:
+            self.insert_files_entry()
 
-        except (PermissionError, OSError):
-            return {}
-    
     def clear_tree(self):
         """Clear tree view"""
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-    
+        self.tree.delete(*self.tree.get_children())
+        self.rows_loaded = 0
+
     def populate_tree(self):
         """Populate tree with scan results, including virtual files entry if needed"""
+        self.clear_tree()
+        self.insert_files_entry()
+
+        # Only the first page of folders, the rest is loaded on scroll
+        self.load_more_rows()
+
+    def load_more_rows(self):
+        """Insert the next page of folders at the end of the table"""
+        self.loading_rows = False
+        page = self.folder_data[self.rows_loaded:self.rows_loaded + self.row_page_size]
+        for folder in page:
+            self.tree.insert('', tk.END, text=folder.name, values=self.folder_row_values(folder))
+        self.rows_loaded += len(page)
+
+    def on_tree_scroll(self, first, last):
+        """Scrollbar update from the table, loads the next page near the bottom"""
+        self.v_scrollbar.set(first, last)
+        if float(last) > 0.9 and self.rows_loaded < len(self.folder_data) and not self.loading_rows:
+            self.loading_rows = True
+            self.root.after_idle(self.load_more_rows)
+
+    def insert_files_entry(self):
+        """Add the virtual entry for files directly in the current folder"""
         # Calculate total size of all subfolders
-        subfolders_total = sum(folder['size_bytes'] for folder in self.folder_data)
+        subfolders_total = sum(folder.size for folder in self.folder_data)
 
         # Get total size from cache if available, otherwise use subfolders total
         path = self.current_path.get()
         total_size = subfolders_total
-        if path in self.scan_cache:
-            total_size = self.scan_cache[path].get('total_size', subfolders_total)
+        files_alloc = 0
+        found = self.find_cache_entry(path)
+        if found is not None:
+            total_size = found[1].size
+            files_alloc = found[1].own_totals()[2]
 
         # Calculate size of files in root (not in subfolders)
         files_size = total_size - subfolders_total
@@ -821,49 +1213,53 @@ class StorageManager:
 
             # Insert virtual entry with special styling
             self.tree.insert('', 0, text='[Files in this folder]',
-                           values=(files_gb, files_mb, '-', '-', path),
+                           values=(files_gb, files_mb, '-', '-', path,
+                                   round(files_alloc / (1024**3), 3), ''),
                            tags=('files_entry',))
-
-        # Insert all actual folders
-        for folder in self.folder_data:
-            self.tree.insert('', tk.END, text=folder['name'],
-                           values=(folder['size_gb'], folder['size_mb'],
-                                 folder['files'], folder['modified'], folder['path']))
-
-        # Configure tag for virtual files entry (gray, italic)
-        self.tree.tag_configure('files_entry', foreground='#888888', font=('Segoe UI', 10, 'italic'))
     
     def refresh_scan(self):
-        """Refresh the current scan (force re-scan, ignoring cache)"""
+        """Refresh the current scan, re-reading only folders that changed"""
         if not self.scanning:
-            path = self.current_path.get()
-            # Remove this path from cache to force fresh scan
-            if path in self.scan_cache:
-                del self.scan_cache[path]
             self.start_scan(force_refresh=True)
 
     def clear_cache(self):
         """Clear the entire scan cache"""
         cache_count = len(self.scan_cache)
+        if self.cache_store is not None:
+            cache_count = self.cache_store.stats()[0]
+            self.cache_store.clear()
         self.scan_cache.clear()
+        self.dirty_cache_paths.clear()
         messagebox.showinfo("Cache Cleared", f"Cleared cache containing {cache_count} scanned locations.")
         self.status_text.set("Cache cleared")
         self.update_cache_info()
 
     def update_cache_info(self):
         """Update cache information display"""
-        cache_count = len(self.scan_cache)
+        if self.cache_store is not None:
+            cache_count, total_cached = self.cache_store.stats()
+        else:
+            cache_count = len(self.scan_cache)
+            total_cached = sum(entry['total_size'] for entry in self.scan_cache.values())
+
         if cache_count == 0:
             self.cache_info.set("Cache: Empty")
         else:
             # Calculate total cached data size
-            total_cached_gb = sum(entry['total_size'] for entry in self.scan_cache.values()) / (1024**3)
-            self.cache_info.set(f"💾 Cache: {cache_count} locations ({total_cached_gb:.1f} GB)")
+            total_cached_gb = total_cached / (1024**3)
+            memory_mb = self.scan_cache.memory_bytes / (1024**2)
+            self.cache_info.set(f"💾 Cache: {cache_count} locations ({total_cached_gb:.1f} GB) | "
+                                f"{len(self.scan_cache)} in memory, {memory_mb:.1f} MB")
     
     def on_item_select(self, event):
         """Handle item selection"""
         selection = self.tree.selection()
-        if selection:
+        if len(selection) > 1:
+            paths = self.selected_paths()
+            self.details_text.delete(1.0, tk.END)
+            self.details_text.insert(1.0, self.selection_summary(paths) + "\n" +
+                                     "\n".join(f"  • {os.path.basename(path)}" for path in paths))
+        elif selection:
             item = selection[0]
             values = self.tree.item(item)
             folder_name = values['text']
@@ -874,6 +1270,7 @@ class StorageManager:
                 details = f"""Selected Folder: {folder_name}
 
 Size: {folder_values[0]} GB ({folder_values[1]} MB)
+On Disk: {folder_values[5]} GB
 Files: {folder_values[2]:,}
 Last Modified: {folder_values[3]}
 Full Path: {folder_values[4]}
@@ -886,9 +1283,31 @@ Average file size: {(folder_values[1] * 1024 * 1024) / max(folder_values[2], 1):
 Path Components:
 {path_components}
 """
+                found = self.find_cache_entry(str(folder_values[4]))
+                breakdown = found[1].type_breakdown() if found is not None and found[1] is not None else []
+                if breakdown:
+                    details += "\nFile Types:\n" + "\n".join(
+                        f"  • {category}: {size / (1024**2):,.1f} MB, {files:,} files"
+                        for category, size, files in breakdown) + "\n"
+
+                largest = self.largest_files_under(str(folder_values[4]))[:5]
+                if largest:
+                    details += "\nLargest Files:\n" + "\n".join(
+                        f"  • {size / (1024**2):,.1f} MB  {os.path.basename(file_path)}"
+                        for size, file_path in largest) + "\n"
                 self.details_text.delete(1.0, tk.END)
                 self.details_text.insert(1.0, details)
     
+    def selection_summary(self, paths: List[str]) -> str:
+        """Combined totals of several selected folders"""
+        nodes = [found[1] for found in map(self.find_cache_entry, paths)
+                 if found is not None and found[1] is not None]
+        size = sum(node.size for node in nodes)
+        return (f"{len(paths):,} folders selected\n\n"
+                f"Size: {round(size / (1024**3), 3)} GB ({round(size / (1024**2), 1)} MB)\n"
+                f"On Disk: {round(sum(node.alloc for node in nodes) / (1024**3), 3)} GB\n"
+                f"Files: {sum(node.files for node in nodes):,}\n")
+
     def on_item_double_click(self, event):
         """Handle double-click to drill down"""
         selection = self.tree.selection()
@@ -923,45 +1342,515 @@ Path Components:
             messagebox.showwarning("Warning", "Please select a folder to navigate to.")
     
     def open_selected_folder(self):
-        """Open selected folder in explorer"""
-        selection = self.tree.selection()
-        if selection:
-            item = selection[0]
-            values = self.tree.item(item)['values']
-            if values:
-                folder_path = values[4]
-                if platform.system() == "Windows":
-                    os.startfile(folder_path)
-                elif platform.system() == "Darwin":
-                    subprocess.run(["open", folder_path])
-                else:
-                    subprocess.run(["xdg-open", folder_path])
+        """Open the selected folders in explorer, up to ten at once"""
+        for folder_path in self.selected_paths()[:10]:
+            if platform.system() == "Windows":
+                os.startfile(folder_path)
+            elif platform.system() == "Darwin":
+                subprocess.run(["open", folder_path])
+            else:
+                subprocess.run(["xdg-open", folder_path])
     
+    def selected_paths(self) -> List[str]:
+        """Paths of the selected folder rows, the files entry is left out"""
+        paths = []
+        for item in self.tree.selection():
+            values = self.tree.item(item)
+            if 'files_entry' not in values['tags'] and values['values']:
+                paths.append(str(values['values'][4]))
+        return paths
+
     def delete_selected(self):
-        """Delete selected folder (with confirmation)"""
-        selection = self.tree.selection()
-        if not selection:
+        """Delete the selected folders (with confirmation)"""
+        paths = self.selected_paths()
+        if not paths:
             messagebox.showwarning("Warning", "Please select a folder to delete.")
             return
-            
-        item = selection[0]
-        values = self.tree.item(item)
-        folder_name = values['text']
-        folder_path = values['values'][4] if values['values'] else ""
-        
-        result = messagebox.askyesno("Confirm Deletion", 
-                                   f"Are you sure you want to delete '{folder_name}'?\n\n"
-                                   f"Path: {folder_path}\n\n"
-                                   f"This action cannot be undone!")
-        
-        if result:
-            try:
-                import shutil
-                shutil.rmtree(folder_path)
-                messagebox.showinfo("Success", f"Folder '{folder_name}' has been deleted.")
+        description = f"'{os.path.basename(paths[0])}'" if len(paths) == 1 else f"{len(paths):,} folders"
+        self.delete_paths(paths, description)
+
+    def move_selected(self):
+        """Move the selected folders into another folder, e.g. an archive disk"""
+        paths = self.selected_paths()
+        if not paths:
+            messagebox.showwarning("Warning", "Please select the folders to move.")
+            return
+        destination = filedialog.askdirectory(title="Move To")
+        if not destination:
+            return
+        destination = os.path.normpath(destination)
+        if any(destination == path or Path(path) in Path(destination).parents for path in paths):
+            messagebox.showerror("Error", "Cannot move a folder into itself.")
+            return
+        if self.confirm_job(f"move {len(paths):,} folder(s) to {destination}", paths, "Confirm Move"):
+            self.run_job(MoveJob(paths, destination, self.known_size(paths)))
+
+    def compress_selected(self):
+        """Replace the selected folders with zip archives"""
+        paths = self.selected_paths()
+        if not paths:
+            messagebox.showwarning("Warning", "Please select the folders to compress.")
+            return
+        if self.confirm_job(f"compress {len(paths):,} folder(s) into zip archives and remove the originals",
+                            paths, "Confirm Compress"):
+            self.run_job(CompressJob(paths, self.known_size(paths)))
+
+    def delete_paths(self, paths: List[str], description: str, on_done=None) -> bool:
+        """
+        Delete files and folders in the background after a single
+        confirmation, then take them out of the cached trees
+        on_done is called with the finished DeleteJob on the UI thread
+        Returns: True if the delete was queued
+        """
+        if not self.confirm_job(f"delete {description}", paths, "Confirm Deletion",
+                                "This action cannot be undone!"):
+            return False
+        self.run_job(DeleteJob(paths, self.known_size(paths)), on_done)
+        return True
+
+    def confirm_job(self, action: str, paths: List[str], title: str, warning: str = "") -> bool:
+        """Ask once for a whole batch, refused while a scan is running"""
+        if self.scanning:
+            messagebox.showinfo("Busy", "Please wait for the running scan to finish.")
+            return False
+        shown = "\n".join(paths[:5])
+        if len(paths) > 5:
+            shown += f"\n... and {len(paths) - 5:,} more"
+        message = f"Are you sure you want to {action}?\n\nPath: {shown}"
+        if warning:
+            message += f"\n\n{warning}"
+        return messagebox.askyesno(title, message)
+
+    def known_size(self, paths: List[str]) -> int:
+        """Total size of paths from the cached trees, for progress; nothing is walked"""
+        total = 0
+        for path in paths:
+            found = self.find_cache_entry(path)
+            if found is not None and found[1] is not None:
+                total += found[1].size
+            else:
+                try:
+                    total += os.lstat(path).st_size
+                except OSError:
+                    pass
+        return total
+
+    def run_job(self, job: Job, on_done=None):
+        """Queue a file operation; the cache and table are patched when it ends"""
+        def finished(job):
+            # Runs on the worker thread: only folders left partly changed or
+            # that gained entries are listed again, nothing else is rescanned
+            rescanned = []
+            for path in job.partial:
+                if os.path.isdir(path):
+                    rescanned.append((path, scan_tree(path)))
+            self.root.after(0, lambda: self.apply_job_removals(job, rescanned, on_done))
+
+        polling = bool(self.job_queue.active())
+        self.job_queue.submit(job, finished)
+        self.cancel_btn.config(state='normal')
+        self.status_text.set(f"Queued: {job.describe()}")
+        if not polling:
+            self.root.after(self.progress_interval_ms, self.poll_jobs)
+
+    def poll_jobs(self):
+        """Show the progress of queued and running jobs, repeats until all ended"""
+        active = self.job_queue.active()
+        self.refresh_jobs_window()
+        if not active:
+            return
+        running = [job for job in active if job.state == 'running']
+        if not self.scanning:  # a running scan shows its own progress
+            if running:
+                self.scan_progress.set(sum(job.percent for job in running) / len(running))
+            self.scan_stats.set("\n".join(f"{job.describe()}: {job.summary()}" for job in running) +
+                                (f"\n{len(active) - len(running):,} more queued" if len(active) > len(running) else ""))
+        self.root.after(self.progress_interval_ms, self.poll_jobs)
+
+    def apply_job_removals(self, job: Job, rescanned, on_done=None):
+        """
+        Take what a finished job removed out of the cache, then list the
+        folders that gained entries off the UI thread. The listings reuse
+        cached subtrees, so they must run on the patched tree: a folder
+        moved into one of its ancestors would otherwise be counted twice.
+        """
+        for path, size, alloc, is_dir in job.removed:
+            removed = None
+            if not is_dir:
+                if size is None:
+                    continue  # Not counted by scans
+                removed = ScanNode(os.path.basename(path))
+                removed.add_file(removed.name, size, alloc)
+            self.remove_from_cache(path, removed)
+        for path, node in rescanned:
+            self.patch_cached_tree(path, node)
+
+        threading.Thread(target=self.relist_changed_dirs, args=(job, on_done), daemon=True).start()
+
+    def relist_changed_dirs(self, job: Job, on_done=None):
+        """Worker thread: list the folders a job added entries to, shallowest first"""
+        rescanned = []
+        for dir_path in sorted(job.changed_dirs, key=lambda p: (p.count(os.sep), p)):
+            found = self.find_cache_entry(dir_path)
+            if found is not None and found[1] is not None:
+                node = rescan_directory(dir_path, found[1])
+                if node is not None:
+                    rescanned.append((dir_path, node))
+        self.root.after(0, lambda: self.finish_job(job, rescanned, on_done))
+
+    def finish_job(self, job: Job, rescanned, on_done=None):
+        """Patch the cache and table with the folders listed again after a job"""
+        if not self.job_queue.active() and not self.scanning:
+            self.cancel_btn.config(state='disabled')
+            self.scan_progress.set(0)
+
+        for path, node in rescanned:
+            self.patch_cached_tree(path, node)
+        self.save_cache_to_disk()
+
+        if self.find_cache_entry(self.current_path.get()) is None:
+            if not self.scanning:  # otherwise the running scan fills the view
                 self.refresh_scan()
+        else:
+            self.update_snapshot_diff()
+            self.refresh_visible_rows()
+            self.show_largest_files()
+            self.update_cache_info()
+
+        self.status_text.set(f"✓ {job.describe()}: {job.summary()}")
+        self.refresh_jobs_window()
+        if job.errors:
+            messagebox.showerror("Error", f"{job.describe()}: {len(job.errors):,} failed:\n" +
+                                 "\n".join(f"{path}: {message}" for path, message in job.errors[:5]))
+        if on_done is not None:
+            on_done(job)
+
+    def show_jobs(self):
+        """Window listing queued, running and finished jobs"""
+        if self.jobs_window is not None and self.jobs_window.winfo_exists():
+            self.jobs_window.lift()
+            return
+
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Jobs")
+        dialog.geometry("700x300")
+        dialog.configure(bg='#2b2b2b')
+        dialog.transient(self.root)
+        self.jobs_window = dialog
+
+        frame = ttk.Frame(dialog, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
+        self.jobs_tree = ttk.Treeview(frame, columns=('State', 'Progress', 'Details'), show='tree headings')
+        self.jobs_tree.heading('#0', text='Job', anchor='w')
+        self.jobs_tree.column('#0', width=250, minwidth=150)
+        self.jobs_tree.heading('State', text='State', anchor='w')
+        self.jobs_tree.column('State', width=80, minwidth=60, stretch=False)
+        self.jobs_tree.heading('Progress', text='Progress', anchor='e')
+        self.jobs_tree.column('Progress', width=70, minwidth=60, anchor='e', stretch=False)
+        self.jobs_tree.heading('Details', text='Details', anchor='w')
+        self.jobs_tree.column('Details', width=300, minwidth=150)
+        self.jobs_tree.pack(fill=tk.BOTH, expand=True)
+
+        def cancel_selected():
+            selected = set(self.jobs_tree.selection())
+            for job in self.job_queue.jobs:
+                if str(job.id) in selected:
+                    job.cancel()
+
+        def clear_finished():
+            self.job_queue.clear_finished()
+            self.refresh_jobs_window()
+
+        button_frame = ttk.Frame(frame)
+        button_frame.pack(fill=tk.X, pady=(10, 0))
+        ttk.Button(button_frame, text="Cancel Job",
+                   command=cancel_selected, width=12).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(button_frame, text="Clear Finished",
+                   command=clear_finished, width=14).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Close",
+                   command=dialog.destroy, width=10).pack(side=tk.RIGHT)
+        self.refresh_jobs_window()
+
+    def refresh_jobs_window(self):
+        """
+        Update the jobs window rows in place, if it is open, so the
+        selection survives the updates while jobs run
+        """
+        if self.jobs_window is None or not self.jobs_window.winfo_exists():
+            return
+        jobs = {str(job.id): job for job in self.job_queue.jobs}
+        stale = [item for item in self.jobs_tree.get_children() if item not in jobs]
+        if stale:
+            self.jobs_tree.delete(*stale)
+        for index, (iid, job) in enumerate(jobs.items()):
+            details = job.summary()
+            if job.state == 'running' and job.current_path:
+                details = job.current_path
+            values = (job.state, f"{job.percent:.0f}%", details)
+            if self.jobs_tree.exists(iid):
+                self.jobs_tree.item(iid, values=values)
+            else:
+                self.jobs_tree.insert('', index, iid=iid, text=job.describe(), values=values)
+
+    def remove_from_cache(self, path, removed: Optional[ScanNode] = None):
+        """
+        Take a deleted folder, or a file counted in removed, out of every
+        cached tree, subtracting its size from all cached ancestors
+        """
+        for cached_path in list(self.scan_cache):
+            if cached_path == path or Path(path) in Path(cached_path).parents:
+                del self.scan_cache[cached_path]
+                self.dirty_cache_paths.discard(cached_path)
+        if self.cache_store is not None:
+            self.cache_store.delete(path)
+            self.cache_store.delete_under(path)
+
+        for parent in Path(path).parents:
+            cache_entry = self.get_cache_entry(str(parent))
+            if cache_entry is None:
+                continue
+            old_node = remove_node(cache_entry['tree'], str(parent), path, removed)
+            if old_node is None:
+                continue
+            cache_entry['total_size'] = cache_entry['tree'].size
+            cache_entry['subdirs_count'] = len(cache_entry['tree'].children)
+            cache_entry['largest_files'] = [item for item in merge_largest_files(
+                cache_entry.get('largest_files', []), path, []) if item[1] != path]
+            self.dirty_cache_paths.add(str(parent))
+            if removed is None:
+                self.scan_cache.adjust(str(parent), -estimate_tree_bytes(old_node))
+
+    def save_snapshot(self, path, node: ScanNode):
+        """Add a finished scan to the scan history of path"""
+        if self.cache_store is None or self.max_snapshots <= 0:
+            return
+        try:
+            self.cache_store.add_snapshot(path, node, time.time(), keep=self.max_snapshots)
+        except Exception as e:
+            print(f"Failed to save snapshot: {e}")
+
+    def snapshot_root(self, path) -> Optional[str]:
+        """The folder whose scan history covers path: itself or the nearest scanned ancestor"""
+        if self.cache_store is None:
+            return None
+        for candidate in [path] + [str(parent) for parent in Path(path).parents]:
+            if self.cache_store.list_snapshots(candidate):
+                return candidate
+        return None
+
+    def show_history(self):
+        """List earlier scans of the current folder and compare one with the latest"""
+        root_path = self.snapshot_root(self.current_path.get())
+        if root_path is None:
+            messagebox.showinfo("History", "No earlier scans of this folder yet. "
+                                           "Every completed scan is added to its history.")
+            return
+
+        dialog = tk.Toplevel(self.root)
+        dialog.title(f"Scan History - {root_path}")
+        dialog.geometry("700x560")
+        dialog.configure(bg='#2b2b2b')
+        dialog.transient(self.root)
+
+        frame = ttk.Frame(dialog, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        snapshots = ttk.Treeview(frame, columns=('Scanned', 'Total (GB)'), show='headings', height=6)
+        snapshots.heading('Scanned', text='Scanned', anchor='w')
+        snapshots.heading('Total (GB)', text='Total (GB)', anchor='e')
+        snapshots.column('Total (GB)', anchor='e')
+        for timestamp, total_size in self.cache_store.list_snapshots(root_path):
+            snapshots.insert('', tk.END, iid=repr(timestamp),
+                             values=(time.strftime('%Y-%m-%d %H:%M', time.localtime(timestamp)),
+                                     round(total_size / (1024**3), 2)))
+        snapshots.pack(fill=tk.X)
+
+        status = tk.StringVar(value="Select a scan to compare the latest one with")
+        ttk.Label(frame, textvariable=status).pack(anchor='w', pady=(10, 5))
+
+        changes = ttk.Treeview(frame, columns=('Change', 'Folder'), show='headings')
+        changes.heading('Change', text='Change', anchor='e')
+        changes.column('Change', width=100, minwidth=80, anchor='e', stretch=False)
+        changes.heading('Folder', text='Folder', anchor='w')
+        changes.pack(fill=tk.BOTH, expand=True)
+
+        def show_changes(diff, timestamp):
+            if not dialog.winfo_exists():
+                return
+            changes.delete(*changes.get_children())
+            for label, items in (("Grew", diff.growers()), ("Shrank", diff.shrinkers())):
+                for size_change, relative, kind in items:
+                    folder = os.path.join(root_path, relative) if relative else root_path
+                    if kind != 'changed':
+                        folder += f"  ({kind})"
+                    changes.insert('', tk.END, values=(format_size_change(size_change), folder))
+            total = diff.change('')
+            status.set(f"Since {time.strftime('%Y-%m-%d %H:%M', time.localtime(timestamp))}: "
+                       f"{format_size_change(total[0]) or 'no change'}, {total[1]:+,} files "
+                       f"| {len(diff.totals):,} folders changed")
+
+        def compare():
+            selection = snapshots.selection()
+            if not selection:
+                return
+            timestamp = float(selection[0])
+            cache_entry = self.get_cache_entry(root_path)
+            if cache_entry is None:
+                messagebox.showwarning("Warning", "Scan this folder again to compare with its history.",
+                                       parent=dialog)
+                return
+            current = cache_entry['tree']
+            status.set("Comparing...")
+
+            def run():
+                try:
+                    old = self.cache_store.get_snapshot(root_path, timestamp)
+                    diff = diff_trees(old, current)
+                except Exception as e:
+                    self.root.after(0, lambda e=e: status.set(f"Failed to compare: {e}"))
+                    return
+                self.root.after(0, lambda: apply(old, diff, timestamp))
+
+            threading.Thread(target=run, daemon=True).start()
+
+        def apply(old, diff, timestamp):
+            self.snapshot_compare = {'root': root_path, 'timestamp': timestamp, 'tree': old, 'diff': diff}
+            self.apply_display_columns()
+            self.sync_rows()
+            show_changes(diff, timestamp)
+
+        def stop_comparing():
+            self.snapshot_compare = None
+            self.apply_display_columns()
+            self.sync_rows()
+            changes.delete(*changes.get_children())
+            status.set("Select a scan to compare the latest one with")
+
+        button_frame = ttk.Frame(frame)
+        button_frame.pack(fill=tk.X, pady=(10, 0))
+        ttk.Button(button_frame, text="Compare",
+                   command=compare, width=10).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(button_frame, text="Stop Comparing",
+                   command=stop_comparing, width=15).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Close",
+                   command=dialog.destroy, width=10).pack(side=tk.RIGHT)
+
+        if self.snapshot_compare is not None and self.snapshot_compare['root'] == root_path:
+            show_changes(self.snapshot_compare['diff'], self.snapshot_compare['timestamp'])
+
+    def find_duplicates(self):
+        """Search the current folder for duplicate files in the background"""
+        path = self.current_path.get()
+        if not os.path.isdir(path):
+            messagebox.showerror("Error", "Invalid directory path")
+            return
+        store = self.cache_store if self.cache_enabled and self.cache_ready.is_set() else None
+        finder = DuplicateFinder(path, store, io_workers=self.max_workers)
+        dialog = self.show_duplicates_dialog(finder)
+
+        def run():
+            try:
+                groups = finder.run()
+                self.root.after(0, lambda: self.show_duplicate_groups(dialog, finder, groups))
             except Exception as e:
-                messagebox.showerror("Error", f"Failed to delete folder: {str(e)}")
+                self.root.after(0, lambda e=e: messagebox.showerror("Error", f"Duplicate search failed: {e}"))
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def show_duplicates_dialog(self, finder: DuplicateFinder) -> tk.Toplevel:
+        """Window listing duplicate groups, showing progress until the search ends"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title(f"Duplicate Files - {finder.path}")
+        dialog.geometry("800x500")
+        dialog.configure(bg='#2b2b2b')
+        dialog.transient(self.root)
+
+        frame = ttk.Frame(dialog, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        dialog.status = tk.StringVar(value="Listing files...")
+        ttk.Label(frame, textvariable=dialog.status).pack(anchor='w', pady=(0, 10))
+
+        tree_frame = ttk.Frame(frame)
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+        dialog.tree = ttk.Treeview(tree_frame, columns=('Size (MB)',), show='tree headings')
+        dialog.tree.heading('#0', text='File', anchor='w')
+        dialog.tree.column('#0', width=600, minwidth=300)
+        dialog.tree.heading('Size (MB)', text='Size (MB)', anchor='e')
+        dialog.tree.column('Size (MB)', width=100, minwidth=80, anchor='e', stretch=False)
+        scroll = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=dialog.tree.yview)
+        dialog.tree.configure(yscrollcommand=scroll.set)
+        dialog.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scroll.pack(side=tk.RIGHT, fill=tk.Y)
+
+        button_frame = ttk.Frame(frame)
+        button_frame.pack(fill=tk.X, pady=(10, 0))
+        ttk.Button(button_frame, text="Select Extra Copies",
+                   command=lambda: self.select_extra_copies(dialog), width=18).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(button_frame, text="Delete Selected",
+                   command=lambda: self.delete_duplicates(dialog), width=15).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Close",
+                   command=dialog.destroy, width=10).pack(side=tk.RIGHT)
+
+        # Closing the window stops the search
+        dialog.bind('<Destroy>', lambda e: finder.cancel() if e.widget is dialog else None)
+
+        def poll():
+            if not dialog.winfo_exists() or finder.stage == "Done" or finder.cancelled:
+                return
+            dialog.status.set(f"{finder.stage}... {finder.files_seen:,} files | "
+                              f"{finder.files_hashed:,} read ({finder.bytes_hashed / (1024**2):,.1f} MB) | "
+                              f"{finder.cache_hits:,} from cache")
+            dialog.after(200, poll)
+
+        poll()
+        return dialog
+
+    def show_duplicate_groups(self, dialog: tk.Toplevel, finder: DuplicateFinder, groups):
+        """Fill the duplicates window, one expandable row per group"""
+        if not dialog.winfo_exists():
+            return
+        for group in groups:
+            size_mb = round(group.size / (1024**2), 1)
+            parent = dialog.tree.insert('', tk.END, open=True, values=(size_mb,),
+                                        text=f"{len(group.paths)} copies, "
+                                             f"{group.reclaimable / (1024**2):,.1f} MB reclaimable")
+            for path in group.paths:
+                dialog.tree.insert(parent, tk.END, iid=path, text=path, values=(size_mb,))
+
+        reclaimable = sum(group.reclaimable for group in groups)
+        dialog.status.set(f"{len(groups):,} groups of duplicates, {reclaimable / (1024**3):.2f} GB reclaimable | "
+                          f"{finder.files_hashed:,} files read, {finder.cache_hits:,} hashes from cache")
+
+    def select_extra_copies(self, dialog: tk.Toplevel):
+        """Select every copy but the first in each group"""
+        extra = [path for group in dialog.tree.get_children()
+                 for path in dialog.tree.get_children(group)[1:]]
+        dialog.tree.selection_set(extra)
+
+    def delete_duplicates(self, dialog: tk.Toplevel):
+        """Delete the selected copies, always keeping one file of each group"""
+        selected = set(item for item in dialog.tree.selection() if dialog.tree.parent(item))
+        if not selected:
+            messagebox.showwarning("Warning", "Please select the copies to delete.", parent=dialog)
+            return
+        for group in dialog.tree.get_children():
+            if all(path in selected for path in dialog.tree.get_children(group)):
+                messagebox.showwarning("Warning", "Keep at least one copy of every file.", parent=dialog)
+                return
+
+        def remove_rows(job):
+            if not dialog.winfo_exists():
+                return
+            for path, _, _, _ in job.removed:
+                if dialog.tree.exists(path):
+                    dialog.tree.delete(path)
+            for group in dialog.tree.get_children():
+                if len(dialog.tree.get_children(group)) < 2:
+                    dialog.tree.delete(group)
+
+        paths = sorted(selected)
+        self.delete_paths(paths, f"{len(paths):,} duplicate files", on_done=remove_rows)
     
     def show_properties(self):
         """Show detailed properties of selected folder"""
@@ -970,6 +1859,11 @@ Path Components:
             messagebox.showwarning("Warning", "Please select a folder.")
             return
             
+        paths = self.selected_paths()
+        if len(paths) > 1:
+            messagebox.showinfo("Properties", self.selection_summary(paths))
+            return
+
         item = selection[0]
         values = self.tree.item(item)
         if values['values']:
@@ -994,20 +1888,34 @@ Path Components:
             try:
                 import csv
                 with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-                    fieldnames = ['Folder Name', 'Size (GB)', 'Size (MB)', 'Files', 'Modified', 'Full Path']
+                    fieldnames = ['Folder Name', 'Size (GB)', 'Size (MB)', 'On Disk (GB)', 'Change', 'Files',
+                                  'Modified', 'Full Path']
                     writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
 
                     writer.writeheader()
                     for folder in self.folder_data:
+                        size_gb, size_mb, files, modified, folder_path, disk_gb, change = \
+                            self.folder_row_values(folder)
                         writer.writerow({
-                            'Folder Name': folder['name'],
-                            'Size (GB)': folder['size_gb'],
-                            'Size (MB)': folder['size_mb'],
-                            'Files': folder['files'],
-                            'Modified': folder['modified'],
-                            'Full Path': folder['path']
+                            'Folder Name': folder.name,
+                            'Size (GB)': size_gb,
+                            'Size (MB)': size_mb,
+                            'On Disk (GB)': disk_gb,
+                            'Change': change,
+                            'Files': files,
+                            'Modified': modified,
+                            'Full Path': folder_path
                         })
 
+                    largest = self.largest_files_under(self.current_path.get())
+                    if largest:
+                        rows = csv.writer(csvfile)
+                        rows.writerow([])
+                        rows.writerow(['Largest Files', 'Size (GB)', 'Size (MB)', 'Full Path'])
+                        for size, file_path in largest:
+                            rows.writerow([os.path.basename(file_path), round(size / (1024**3), 3),
+                                           round(size / (1024**2), 1), file_path])
+
                 messagebox.showinfo("Success", f"Report exported to: {filename}")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to export report: {str(e)}")
@@ -1020,10 +1928,17 @@ Path Components:
                 with open(settings_file, 'r', encoding='utf-8') as f:
                     settings = json.load(f)
                     self.cache_dir = Path(settings.get('cache_dir', self.cache_dir))
-                    self.cache_file = self.cache_dir / "scan_cache.json"
                     self.cache_ttl = settings.get('cache_ttl', 3600)
                     self.cache_enabled = settings.get('cache_enabled', True)
                     self.max_workers = settings.get('max_workers', 4)
+                    self.scan_backend = settings.get('scan_backend', 'threads')
+                    self.live_updates = settings.get('live_updates', False)
+                    self.profile_scans = settings.get('profile_scans', False)
+                    self.show_disk_usage = settings.get('show_disk_usage', False)
+                    self.max_snapshots = settings.get('max_snapshots', 10)
+                    self.checkpoint_minutes = settings.get('checkpoint_minutes', 5)
+                    self.cache_max_entries = settings.get('cache_max_entries', 500)
+                    self.cache_max_memory_mb = settings.get('cache_max_memory_mb', 512)
         except Exception:
             pass  # Use defaults if loading fails
 
@@ -1036,7 +1951,15 @@ Path Components:
                 'cache_dir': str(self.cache_dir),
                 'cache_ttl': self.cache_ttl,
                 'cache_enabled': self.cache_enabled,
-                'max_workers': self.max_workers
+                'max_workers': self.max_workers,
+                'scan_backend': self.scan_backend,
+                'live_updates': self.live_updates,
+                'profile_scans': self.profile_scans,
+                'show_disk_usage': self.show_disk_usage,
+                'max_snapshots': self.max_snapshots,
+                'checkpoint_minutes': self.checkpoint_minutes,
+                'cache_max_entries': self.cache_max_entries,
+                'cache_max_memory_mb': self.cache_max_memory_mb
             }
             with open(settings_file, 'w', encoding='utf-8') as f:
                 json.dump(settings, f, indent=2)
@@ -1044,32 +1967,87 @@ Path Components:
             print(f"Failed to save settings: {e}")
 
     def load_cache_from_disk(self):
-        """Load scan cache from persistent storage"""
+        """
+        Open the persistent cache, entries are read on demand by path
+        An old JSON cache file is imported into the database once
+        """
         try:
-            if self.cache_file.exists():
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-                    # Convert back to proper format
-                    for path, data in cache_data.items():
-                        self.scan_cache[path] = data
-                self.update_cache_info()
-        except Exception:
-            pass  # Start with empty cache if loading fails
+            if self.cache_store is not None:
+                self.cache_store.close()
+            self.cache_store = open_cache_store(self.cache_dir)
+        except Exception as e:
+            print(f"Failed to open cache: {e}")
+            self.cache_store = None  # Cache stays in memory only
+        self.scan_cache.clear()
+        self.dirty_cache_paths.clear()
+
+    def open_cache_in_background(self):
+        """Open the cache store off the UI thread and signal when it is ready"""
+        self.load_cache_from_disk()
+        cache_ready_ms = (time.perf_counter() - APP_START_TIME) * 1000
+        self.cache_ready.set()
+        self.root.after(0, lambda: self.on_cache_ready(cache_ready_ms))
+
+    def on_cache_ready(self, cache_ready_ms):
+        """Report startup time once the cache can be used"""
+        self.update_cache_info()
+        if not self.scanning:
+            self.status_text.set(f"Ready - window in {self.window_ready_ms:.0f} ms, "
+                                 f"cache ready in {cache_ready_ms:.0f} ms")
 
     def save_cache_to_disk(self):
-        """Save scan cache to persistent storage"""
+        """Write the cache entries changed since the last save"""
+        if self.cache_store is None:
+            return
         try:
-            self.cache_dir.mkdir(parents=True, exist_ok=True)
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self.scan_cache, f, indent=2)
+            dirty, self.dirty_cache_paths = self.dirty_cache_paths, set()
+            entries = {path: self.scan_cache.get(path) for path in dirty}
+            self.cache_store.put_many({path: entry for path, entry in entries.items() if entry is not None})
         except Exception as e:
             print(f"Failed to save cache: {e}")
 
+    def on_cache_evict(self, path, cache_entry):
+        """Write an evicted entry to disk if it has unsaved changes"""
+        if path in self.dirty_cache_paths and self.cache_store is not None:
+            try:
+                self.cache_store.put(path, cache_entry)
+                self.dirty_cache_paths.discard(path)
+            except Exception as e:
+                print(f"Failed to save evicted cache entry: {e}")
+
+    def apply_cache_budget(self):
+        """Apply the memory limits from the settings to the loaded cache"""
+        self.scan_cache.max_entries = max(1, self.cache_max_entries)
+        self.scan_cache.max_bytes = max(1, self.cache_max_memory_mb) * 1024 * 1024
+        self.scan_cache.evict()
+
+    def on_close(self):
+        """
+        Save pending cache changes before the window closes
+        A running scan is cancelled and kept, the next scan of its folder resumes from it
+        """
+        self.closing = True
+        self.stop_watching()
+        scanner = self.active_scanner
+        if scanner is not None:
+            self.cancel_scan = True
+            scanner.cancel()
+            scanner.wait()
+            if self.cache_enabled and not scanner.complete:
+                self.store_partial_result(scanner.path, scanner.root, scanner.largest_files.items())
+        self.save_cache_to_disk()
+        if self.cache_store is not None:
+            self.cache_store.close()
+        self.root.destroy()
+
     def cancel_scan_action(self):
-        """Cancel the current scan operation"""
+        """Cancel the current scan, or the queued and running jobs"""
         if self.scanning:
             self.cancel_scan = True
             self.status_text.set("Cancelling scan...")
+        elif self.job_queue.active():
+            self.job_queue.cancel_all()
+            self.status_text.set("Cancelling jobs...")
 
     def toggle_detailed_progress(self):
         """Toggle the detailed progress panel visibility"""
@@ -1088,7 +2066,7 @@ Path Components:
         """Show settings dialog"""
         dialog = tk.Toplevel(self.root)
         dialog.title("Helium Settings")
-        dialog.geometry("500x400")
+        dialog.geometry("500x640")
         dialog.configure(bg='#2b2b2b')
         dialog.transient(self.root)
         dialog.grab_set()
@@ -1133,6 +2111,37 @@ Path Components:
         ttl_var = tk.IntVar(value=self.cache_ttl // 60)
         ttl_spinbox = ttk.Spinbox(ttl_frame, from_=1, to=1440, textvariable=ttl_var, width=10)
         ttl_spinbox.pack(side=tk.LEFT)
+        ttk.Label(ttl_frame, text="(changes below subfolders show after this or a refresh)",
+                 font=('Segoe UI', 8), foreground='#888888').pack(side=tk.LEFT, padx=(10, 0))
+
+        # Memory budget
+        budget_frame = ttk.Frame(cache_frame)
+        budget_frame.pack(fill=tk.X, pady=(0, 10))
+        ttk.Label(budget_frame, text="Keep in memory:").pack(side=tk.LEFT, padx=(0, 10))
+        max_entries_var = tk.IntVar(value=self.cache_max_entries)
+        ttk.Spinbox(budget_frame, from_=1, to=100000, textvariable=max_entries_var, width=8).pack(side=tk.LEFT)
+        ttk.Label(budget_frame, text="locations, up to").pack(side=tk.LEFT, padx=5)
+        max_memory_var = tk.IntVar(value=self.cache_max_memory_mb)
+        ttk.Spinbox(budget_frame, from_=16, to=65536, textvariable=max_memory_var, width=8).pack(side=tk.LEFT)
+        ttk.Label(budget_frame, text="MB").pack(side=tk.LEFT, padx=(5, 0))
+
+        # Scan history
+        history_frame = ttk.Frame(cache_frame)
+        history_frame.pack(fill=tk.X, pady=(0, 10))
+        ttk.Label(history_frame, text="Scan history per folder:").pack(side=tk.LEFT, padx=(0, 10))
+        max_snapshots_var = tk.IntVar(value=self.max_snapshots)
+        ttk.Spinbox(history_frame, from_=0, to=1000, textvariable=max_snapshots_var, width=8).pack(side=tk.LEFT)
+        ttk.Label(history_frame, text="scans (at most one an hour, 0 = off)",
+                 font=('Segoe UI', 8), foreground='#888888').pack(side=tk.LEFT, padx=(10, 0))
+
+        # Checkpoints of long scans
+        checkpoint_frame = ttk.Frame(cache_frame)
+        checkpoint_frame.pack(fill=tk.X, pady=(0, 10))
+        ttk.Label(checkpoint_frame, text="Save long scans every:").pack(side=tk.LEFT, padx=(0, 10))
+        checkpoint_var = tk.IntVar(value=self.checkpoint_minutes)
+        ttk.Spinbox(checkpoint_frame, from_=0, to=1440, textvariable=checkpoint_var, width=8).pack(side=tk.LEFT)
+        ttk.Label(checkpoint_frame, text="minutes (resumed after a crash, 0 = off)",
+                 font=('Segoe UI', 8), foreground='#888888').pack(side=tk.LEFT, padx=(10, 0))
 
         # Cache enabled
         cache_enabled_var = tk.BooleanVar(value=self.cache_enabled)
@@ -1145,21 +2154,45 @@ Path Components:
 
         workers_frame = ttk.Frame(perf_frame)
         workers_frame.pack(fill=tk.X)
-        ttk.Label(workers_frame, text="Parallel Scan Threads:").pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Label(workers_frame, text="Parallel Scan Workers:").pack(side=tk.LEFT, padx=(0, 10))
         workers_var = tk.IntVar(value=self.max_workers)
         workers_spinbox = ttk.Spinbox(workers_frame, from_=1, to=16, textvariable=workers_var, width=10)
         workers_spinbox.pack(side=tk.LEFT)
         ttk.Label(workers_frame, text="(1-16, recommended: 4-8)",
                  font=('Segoe UI', 8), foreground='#888888').pack(side=tk.LEFT, padx=(10, 0))
 
+        backend_frame = ttk.Frame(perf_frame)
+        backend_frame.pack(fill=tk.X, pady=(10, 0))
+        ttk.Label(backend_frame, text="Scan Backend:").pack(side=tk.LEFT, padx=(0, 10))
+        backend_names = {'threads': "Threads", 'processes': "Processes"}
+        backend_var = tk.StringVar(value=backend_names.get(self.scan_backend, "Threads"))
+        ttk.Combobox(backend_frame, textvariable=backend_var, values=list(backend_names.values()),
+                     state='readonly', width=12).pack(side=tk.LEFT)
+        ttk.Label(backend_frame, text="(processes speed up first scans on fast SSDs, rescans use threads)",
+                 font=('Segoe UI', 8), foreground='#888888').pack(side=tk.LEFT, padx=(10, 0))
+
+        live_updates_var = tk.BooleanVar(value=self.live_updates)
+        ttk.Checkbutton(perf_frame, text="Live updates (watch the current folder for changes)",
+                       variable=live_updates_var).pack(anchor='w', pady=(10, 0))
+
+        profile_scans_var = tk.BooleanVar(value=self.profile_scans)
+        ttk.Checkbutton(perf_frame, text="Profile scans (timings in the progress details, slightly slower)",
+                       variable=profile_scans_var).pack(anchor='w', pady=(5, 0))
+
+        show_disk_usage_var = tk.BooleanVar(value=self.show_disk_usage)
+        ttk.Checkbutton(perf_frame, text="Show size on disk (sparse files and hard links counted once)",
+                       variable=show_disk_usage_var).pack(anchor='w', pady=(5, 0))
+
         # Cache Info
         info_frame = ttk.Frame(main_frame)
         info_frame.pack(fill=tk.X, pady=(10, 0))
 
         cache_count = len(self.scan_cache)
         cache_size_mb = 0
-        if self.cache_file.exists():
-            cache_size_mb = self.cache_file.stat().st_size / (1024 * 1024)
+        if self.cache_store is not None:
+            cache_count = self.cache_store.stats()[0]
+            if self.cache_store.db_path.exists():
+                cache_size_mb = self.cache_store.db_path.stat().st_size / (1024 * 1024)
 
         info_text = f"Current cache: {cache_count} locations, {cache_size_mb:.2f} MB on disk"
         ttk.Label(info_frame, text=info_text,
@@ -1170,22 +2203,54 @@ Path Components:
         button_frame.pack(side=tk.BOTTOM, pady=(20, 0))
 
         def save_and_close():
-            self.cache_dir = Path(cache_path_var.get())
-            self.cache_file = self.cache_dir / "scan_cache.json"
+            new_cache_dir = Path(cache_path_var.get())
+            if new_cache_dir != self.cache_dir:
+                self.save_cache_to_disk()
+                self.cache_dir = new_cache_dir
+                self.load_cache_from_disk()
+                self.update_cache_info()
             self.cache_ttl = ttl_var.get() * 60
+            self.cache_max_entries = max_entries_var.get()
+            self.cache_max_memory_mb = max_memory_var.get()
+            self.max_snapshots = max_snapshots_var.get()
+            self.checkpoint_minutes = checkpoint_var.get()
+            self.apply_cache_budget()
+            self.update_cache_info()
             self.cache_enabled = cache_enabled_var.get()
             self.max_workers = workers_var.get()
+            self.scan_backend = 'processes' if backend_var.get() == "Processes" else 'threads'
+            self.live_updates = live_updates_var.get()
+            self.profile_scans = profile_scans_var.get()
+            self.show_disk_usage = show_disk_usage_var.get()
+            self.apply_display_columns()
             self.save_settings()
+            if self.live_updates and not self.scanning:
+                self.start_watching(self.current_path.get())
+            elif not self.live_updates:
+                self.stop_watching()
             messagebox.showinfo("Settings Saved", "Settings have been saved successfully!")
             dialog.destroy()
 
         ttk.Button(button_frame, text="Save", command=save_and_close, width=12).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Cancel", command=dialog.destroy, width=12).pack(side=tk.LEFT, padx=5)
 
+def format_size_change(size_change: int) -> str:
+    """Signed size change such as '+1.25 GB' or '-340.0 MB', '' for no change"""
+    if size_change == 0:
+        return ''
+    if abs(size_change) >= 1024**3:
+        return f"{size_change / (1024**3):+.2f} GB"
+    if abs(size_change) >= 1024**2:
+        return f"{size_change / (1024**2):+.1f} MB"
+    return f"{size_change / 1024:+.1f} KB"
+
+
 def main():
     root = tk.Tk()
     app = StorageManager(root)
     root.mainloop()
 
 if __name__ == "__main__":
+    # Needed by the process scan backend in frozen Windows builds
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,340 @@
+"""
+Scan benchmarks for Helium
+
+Generates reproducible synthetic directory trees in a temp dir and times
+every scan mode on each of them. Every measurement runs in a fresh child
+process so peak memory is per scan and one mode cannot warm another's
+Python caches. Results can be saved as JSON and compared between runs.
+
+Usage: python benchmark.py [--shapes wide,deep] [--modes threads,processes]
+                           [--scale N] [--workers N] [--repeat N]
+                           [--save results.json] [--compare old.json]
+
+File contents come from the OS page cache after the first run, so numbers
+are for warm scans. fs_calls counts scandir and stat calls made by the
+scanner, not every syscall (there is one directory open and read per
+scandir, and one lstat per stat). It is not reported for the process
+backend, whose calls happen in the worker processes.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MODES = ['walk', 'threads', 'processes', 'refresh']
+
+
+class ShapeUnsupported(Exception):
+    """The filesystem cannot hold a shape cheaply, the shape is skipped"""
+
+
+def _write_files(path: str, count: int, rng: random.Random, max_size: int):
+    for i in range(count):
+        with open(os.path.join(path, f"file{i}.dat"), 'wb') as f:
+            f.write(b'\0' * rng.randint(0, max_size))
+
+
+def make_wide(root: str, rng: random.Random, scale: int):
+    """One level of many folders with a few files each"""
+    for i in range(2000 * scale):
+        path = os.path.join(root, f"dir{i}")
+        os.mkdir(path)
+        _write_files(path, 5, rng, 4096)
+
+
+def make_deep(root: str, rng: random.Random, scale: int):
+    """A single chain of nested folders"""
+    path = root
+    for i in range(400 * scale):
+        path = os.path.join(path, f"d{i}")
+        os.mkdir(path)
+        _write_files(path, 3, rng, 4096)
+
+
+def make_tiny(root: str, rng: random.Random, scale: int):
+    """Many small files in a few folders"""
+    for i in range(50 * scale):
+        path = os.path.join(root, f"dir{i}")
+        os.mkdir(path)
+        _write_files(path, 400, rng, 100)
+
+
+def _set_sparse(f):
+    """Mark an open file sparse on Windows, where extending it allocates otherwise"""
+    import ctypes
+    import msvcrt
+    from ctypes import wintypes
+    FSCTL_SET_SPARSE = 0x900C4
+    returned = wintypes.DWORD()
+    if not ctypes.windll.kernel32.DeviceIoControl(
+            wintypes.HANDLE(msvcrt.get_osfhandle(f.fileno())), FSCTL_SET_SPARSE,
+            None, 0, None, 0, ctypes.byref(returned), None):
+        raise ShapeUnsupported("the filesystem does not support sparse files")
+
+
+def _write_sparse(path: str, size: int):
+    with open(path, 'wb') as f:
+        if os.name == 'nt':
+            _set_sparse(f)
+        f.truncate(size)
+    # FAT and some network filesystems write out every byte instead
+    st = os.stat(path)
+    if hasattr(st, 'st_blocks') and st.st_blocks * 512 >= size:
+        os.remove(path)
+        raise ShapeUnsupported("the filesystem does not support sparse files")
+
+
+def make_sparse(root: str, rng: random.Random, scale: int):
+    """Few huge sparse files, large sizes on little disk"""
+    for i in range(10 * scale):
+        path = os.path.join(root, f"dir{i}")
+        os.mkdir(path)
+        for j in range(2):
+            _write_sparse(os.path.join(path, f"huge{j}.img"), rng.randint(1, 4) * 1024**3)
+
+
+def make_skewed(root: str, rng: random.Random, scale: int):
+    """Many light folders next to one heavy nested folder"""
+    for i in range(50 * scale):
+        path = os.path.join(root, f"light{i}")
+        os.mkdir(path)
+        _write_files(path, 5, rng, 4096)
+    heavy = os.path.join(root, "heavy")
+    os.mkdir(heavy)
+    for a in range(8 * scale):
+        for b in range(8):
+            for c in range(8):
+                path = os.path.join(heavy, f"a{a}", f"b{b}", f"c{c}")
+                os.makedirs(path)
+                _write_files(path, 10, rng, 1024)
+
+
+SHAPES: Dict[str, Callable[[str, random.Random, int], None]] = {
+    'wide': make_wide,
+    'deep': make_deep,
+    'tiny': make_tiny,
+    'sparse': make_sparse,
+    'skewed': make_skewed
+}
+
+
+def generate_tree(shape: str, root: str, scale: int = 1, seed: int = 0):
+    """Build the synthetic tree for shape under root, the same for a given seed"""
+    SHAPES[shape](root, random.Random(seed), scale)
+
+
+def _count_fs_calls() -> Dict[str, int]:
+    """Wrap os.scandir and os.stat in this process to count filesystem calls"""
+    counts = {'scandir': 0, 'stat': 0}
+    real_scandir, real_stat = os.scandir, os.stat
+
+    class CountingEntry:
+        def __init__(self, entry):
+            self._entry = entry
+
+        def __getattr__(self, name):
+            return getattr(self._entry, name)
+
+        def stat(self, **kwargs):
+            counts['stat'] += 1
+            return self._entry.stat(**kwargs)
+
+    class CountingScandir:
+        def __init__(self, path):
+            counts['scandir'] += 1
+            self._it = real_scandir(path)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self._it.close()
+
+        def __iter__(self):
+            return (CountingEntry(entry) for entry in self._it)
+
+    def counting_stat(*args, **kwargs):
+        counts['stat'] += 1
+        return real_stat(*args, **kwargs)
+
+    os.scandir = CountingScandir
+    os.stat = counting_stat
+    return counts
+
+
+def _scan(mode: str, path: str, workers: int, previous=None):
+    from scanner import ParallelScanner, ProcessScanner, scan_tree
+
+    if mode == 'walk':
+        return scan_tree(path)
+    if mode == 'processes':
+        return ProcessScanner(path, workers).scan()
+    return ParallelScanner(path, workers, previous).scan()
+
+
+def _peak_rss_kb() -> Optional[int]:
+    if resource is None:
+        return None
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    peak = max(own, children)
+    # macOS reports bytes, Linux kilobytes
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def run_child(mode: str, path: str, workers: int, count_calls: bool) -> Dict:
+    """Child process side: one measured scan, returned as a dict"""
+    previous = _scan('threads', path, workers) if mode == 'refresh' else None
+    counts = _count_fs_calls() if count_calls else None
+
+    started = time.perf_counter()
+    root = _scan(mode, path, workers, previous)
+    wall = time.perf_counter() - started
+
+    dirs = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        dirs += 1
+        stack.extend(node.children)
+
+    result = {
+        'wall': wall,
+        'entries': root.files + dirs - 1,
+        'dirs': dirs,
+        'size': root.size,
+        'peak_rss_kb': _peak_rss_kb()
+    }
+    if counts is not None:
+        result['fs_calls'] = counts['scandir'] + counts['stat']
+    return result
+
+
+def measure(mode: str, path: str, workers: int, count_calls: bool = False) -> Dict:
+    """Run one scan of path in a fresh process"""
+    script = os.path.abspath(__file__)
+    command = [sys.executable, script, '--child', mode, path, '--workers', str(workers)]
+    if count_calls:
+        command.append('--count-calls')
+    output = subprocess.run(command, capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(script)).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def benchmark(shapes: List[str], modes: List[str], scale: int, workers: int, repeat: int) -> List[Dict]:
+    """Time every mode on every shape, keeping the best of repeat runs"""
+    results = []
+    for shape in shapes:
+        root = tempfile.mkdtemp(prefix=f"helium_bench_{shape}_")
+        try:
+            try:
+                generate_tree(shape, root, scale)
+            except ShapeUnsupported as e:
+                print(f"Skipping {shape}: {e}", flush=True)
+                continue
+            for mode in modes:
+                # Warm the page cache, then keep the fastest run
+                measure(mode, root, workers)
+                runs = [measure(mode, root, workers) for _ in range(repeat)]
+                best = min(runs, key=lambda r: r['wall'])
+                # Counting wraps every call, so it gets its own untimed run
+                calls_per_entry = None
+                if mode != 'processes' and best['entries']:
+                    calls = measure(mode, root, workers, count_calls=True)['fs_calls']
+                    calls_per_entry = calls / best['entries']
+                results.append({
+                    'shape': shape,
+                    'mode': mode,
+                    'wall': best['wall'],
+                    'entries': best['entries'],
+                    'entries_per_sec': best['entries'] / best['wall'] if best['wall'] > 0 else 0.0,
+                    'peak_rss_kb': max((r['peak_rss_kb'] or 0) for r in runs) or None,
+                    'fs_calls_per_entry': calls_per_entry
+                })
+                print_result(results[-1])
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+def print_result(result: Dict, baseline: Optional[Dict] = None):
+    rss = f"{result['peak_rss_kb'] / 1024:.1f} MB" if result['peak_rss_kb'] else "n/a"
+    calls = result['fs_calls_per_entry']
+    calls = f"{calls:.2f}" if calls is not None else "n/a"
+    line = (f"{result['shape']:<8} {result['mode']:<10} {result['entries']:>9,} entries "
+            f"{result['wall']:>8.3f}s {result['entries_per_sec']:>12,.0f}/s "
+            f"RSS {rss:>9} {calls} calls/entry")
+    if baseline is not None and baseline['entries_per_sec']:
+        change = (result['entries_per_sec'] / baseline['entries_per_sec'] - 1) * 100
+        line += f" ({change:+.1f}% vs baseline)"
+    print(line, flush=True)
+
+
+def compare(results: List[Dict], baseline_file: str):
+    """Print results next to the matching runs of an earlier saved benchmark"""
+    with open(baseline_file, 'r', encoding='utf-8') as f:
+        baseline = {(r['shape'], r['mode']): r for r in json.load(f)['results']}
+    print(f"\nCompared with {baseline_file}:")
+    for result in results:
+        print_result(result, baseline.get((result['shape'], result['mode'])))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark Helium scan modes on synthetic trees")
+    parser.add_argument('--shapes', default=','.join(SHAPES),
+                        help=f"comma separated tree shapes (default: {','.join(SHAPES)})")
+    parser.add_argument('--modes', default=','.join(MODES),
+                        help=f"comma separated scan modes (default: {','.join(MODES)})")
+    parser.add_argument('--scale', type=int, default=1, help="tree size multiplier (default: 1)")
+    parser.add_argument('--workers', type=int, default=4, help="scan workers (default: 4)")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per case (default: 3)")
+    parser.add_argument('--save', help="write results to this JSON file")
+    parser.add_argument('--compare', help="compare with results saved by an earlier run")
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'PATH'), help=argparse.SUPPRESS)
+    parser.add_argument('--count-calls', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        mode, path = args.child
+        print(json.dumps(run_child(mode, path, args.workers, args.count_calls)))
+        return 0
+
+    shapes = [s for s in args.shapes.split(',') if s]
+    modes = [m for m in args.modes.split(',') if m]
+    unknown = [s for s in shapes if s not in SHAPES] + [m for m in modes if m not in MODES]
+    if unknown:
+        print(f"Unknown shape or mode: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    results = benchmark(shapes, modes, args.scale, args.workers, max(1, args.repeat))
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({
+                'timestamp': time.time(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'scale': args.scale,
+                'workers': args.workers,
+                'results': results
+            }, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,358 @@
+"""
+Persistent scan cache for Helium
+
+Keeps one row per scanned location in an SQLite database keyed by path, so
+lookups use the primary key index, only changed entries are written and
+nothing has to be read up front at startup. File content hashes from the
+duplicate finder and the scan history of every scanned folder are kept in
+the same database.
+
+This module must not import tkinter.
+"""
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from scanner import ScanNode, estimate_tree_bytes
+
+
+class CacheStore:
+    """Scan cache entries stored in SQLite, keyed by path"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    path TEXT PRIMARY KEY,
+                    timestamp REAL NOT NULL,
+                    total_size INTEGER NOT NULL,
+                    subdirs_count INTEGER NOT NULL,
+                    tree BLOB NOT NULL,
+                    largest_files TEXT NOT NULL DEFAULT '[]',
+                    incomplete INTEGER NOT NULL DEFAULT 0
+                )""")
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(entries)")}
+            if 'largest_files' not in columns:
+                self._conn.execute("ALTER TABLE entries ADD COLUMN largest_files TEXT NOT NULL DEFAULT '[]'")
+            # Set for the partial tree of a cancelled scan, kept only to resume it
+            if 'incomplete' not in columns:
+                self._conn.execute("ALTER TABLE entries ADD COLUMN incomplete INTEGER NOT NULL DEFAULT 0")
+            # A hash is only reused while the file keeps its size and mtime
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS file_hashes (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime REAL NOT NULL,
+                    partial_hash TEXT,
+                    full_hash TEXT
+                )""")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    path TEXT NOT NULL,
+                    timestamp REAL NOT NULL,
+                    total_size INTEGER NOT NULL,
+                    tree BLOB NOT NULL,
+                    PRIMARY KEY (path, timestamp)
+                )""")
+            self._conn.commit()
+
+    @staticmethod
+    def _encode_tree(node: ScanNode) -> bytes:
+        return zlib.compress(json.dumps(node.to_arrays(), separators=(',', ':')).encode('utf-8'))
+
+    @staticmethod
+    def _encode_snapshot(node: ScanNode) -> bytes:
+        # History is only compared by size, so it is stored without mtimes,
+        # inodes and type breakdowns
+        arrays = node.to_arrays()
+        for key in ('mtime', 'ino', 'types'):
+            del arrays[key]
+        return zlib.compress(json.dumps(arrays, separators=(',', ':')).encode('utf-8'))
+
+    @staticmethod
+    def _decode_tree(data: bytes) -> ScanNode:
+        tree = json.loads(zlib.decompress(data).decode('utf-8'))
+        if isinstance(tree, list):
+            # Written before trees were stored as arrays
+            return ScanNode.from_list(tree)
+        return ScanNode.from_arrays(tree)
+
+    def get(self, path: str) -> Optional[Dict]:
+        """Load the entry for path, or None if it is not cached"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT timestamp, total_size, subdirs_count, tree, largest_files, incomplete "
+                "FROM entries WHERE path = ?",
+                (path,)).fetchone()
+        if row is None:
+            return None
+        return {
+            'tree': self._decode_tree(row[3]),
+            'timestamp': row[0],
+            'total_size': row[1],
+            'subdirs_count': row[2],
+            'largest_files': [tuple(item) for item in json.loads(row[4])],
+            'incomplete': bool(row[5])
+        }
+
+    def put_many(self, entries: Dict[str, Dict]):
+        """Insert or replace the given entries in one transaction"""
+        rows = [(path, entry['timestamp'], entry['total_size'], entry['subdirs_count'],
+                 self._encode_tree(entry['tree']),
+                 json.dumps(entry.get('largest_files', []), separators=(',', ':')),
+                 int(entry.get('incomplete', False)))
+                for path, entry in entries.items()]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries "
+                "(path, timestamp, total_size, subdirs_count, tree, largest_files, incomplete) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    def put(self, path: str, entry: Dict):
+        """Insert or replace a single entry"""
+        self.put_many({path: entry})
+
+    def delete(self, path: str):
+        """Delete the entry for path, if any"""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE path = ?", (path,))
+            self._conn.commit()
+
+    def delete_under(self, path: str):
+        """Delete every entry strictly below path, using an index range scan"""
+        prefix = path.rstrip('/\\') + os.sep
+        upper = prefix[:-1] + chr(ord(os.sep) + 1)
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE path >= ? AND path < ?", (prefix, upper))
+            self._conn.commit()
+
+    def clear(self):
+        """Delete all entries and file hashes"""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.execute("DELETE FROM file_hashes")
+            self._conn.commit()
+
+    def add_snapshot(self, path: str, node: ScanNode, timestamp: float,
+                     keep: int = 10, min_interval: float = 3600):
+        """
+        Add a scan of path to its history, keeping the newest keep snapshots
+        The newest snapshot is replaced if it is less than min_interval
+        seconds newer than the one before it, so frequent scans keep about
+        one snapshot per interval plus the latest, instead of pushing older
+        history out
+        """
+        data = self._encode_snapshot(node)
+        with self._lock:
+            newest = [row[0] for row in self._conn.execute(
+                "SELECT timestamp FROM snapshots WHERE path = ? ORDER BY timestamp DESC LIMIT 2", (path,))]
+            if len(newest) == 2 and newest[0] - newest[1] < min_interval:
+                self._conn.execute("DELETE FROM snapshots WHERE path = ? AND timestamp = ?", (path, newest[0]))
+            self._conn.execute("INSERT OR REPLACE INTO snapshots (path, timestamp, total_size, tree) "
+                               "VALUES (?, ?, ?, ?)", (path, timestamp, node.size, data))
+            self._conn.execute("DELETE FROM snapshots WHERE path = ? AND timestamp NOT IN "
+                               "(SELECT timestamp FROM snapshots WHERE path = ? ORDER BY timestamp DESC LIMIT ?)",
+                               (path, path, max(1, keep)))
+            self._conn.commit()
+
+    def list_snapshots(self, path: str) -> List[Tuple[float, int]]:
+        """(timestamp, total size) of every snapshot of path, newest first"""
+        with self._lock:
+            return self._conn.execute("SELECT timestamp, total_size FROM snapshots WHERE path = ? "
+                                      "ORDER BY timestamp DESC", (path,)).fetchall()
+
+    def get_snapshot(self, path: str, timestamp: float) -> Optional[ScanNode]:
+        """Load one snapshot of path, or None if it no longer exists"""
+        with self._lock:
+            row = self._conn.execute("SELECT tree FROM snapshots WHERE path = ? AND timestamp = ?",
+                                     (path, timestamp)).fetchone()
+        return self._decode_tree(row[0]) if row is not None else None
+
+    def get_hashes(self, paths: List[str]) -> Dict[str, Tuple[int, float, Optional[str], Optional[str]]]:
+        """Cached hashes for the given files: path -> (size, mtime, partial_hash, full_hash)"""
+        result = {}
+        with self._lock:
+            # Stay well below SQLite's limit on query parameters
+            for start in range(0, len(paths), 500):
+                batch = paths[start:start + 500]
+                rows = self._conn.execute(
+                    "SELECT path, size, mtime, partial_hash, full_hash FROM file_hashes "
+                    f"WHERE path IN ({','.join('?' * len(batch))})", batch)
+                for row in rows:
+                    result[row[0]] = row[1:]
+        return result
+
+    def put_hashes(self, hashes: Dict[str, Tuple[int, float, Optional[str], Optional[str]]]):
+        """Insert or replace file hashes in one transaction"""
+        if not hashes:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO file_hashes (path, size, mtime, partial_hash, full_hash) "
+                "VALUES (?, ?, ?, ?, ?)", [(path,) + tuple(row) for path, row in hashes.items()])
+            self._conn.commit()
+
+    def stats(self) -> Tuple[int, int]:
+        """Number of cached locations and the sum of their total sizes"""
+        with self._lock:
+            count, total_size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(total_size), 0) FROM entries").fetchone()
+        return count, total_size
+
+    def import_json(self, json_file: Path) -> int:
+        """
+        Import entries from the old single-file JSON cache
+        Entries from before scan trees were cached are skipped
+        Returns: number of entries imported
+        """
+        with open(json_file, 'r', encoding='utf-8') as f:
+            cache_data = json.load(f)
+
+        entries = {}
+        for path, data in cache_data.items():
+            if 'tree' in data:
+                data['tree'] = ScanNode.from_list(data['tree'])
+                entries[path] = data
+        self.put_many(entries)
+        return len(entries)
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+
+class MemoryCache:
+    """
+    Entries loaded in memory, bounded by an entry count and a memory budget
+
+    When over budget, one of the least recently used entries is evicted.
+    Among those candidates, rarely visited and deeply nested paths go first,
+    so the roots that drill-down depends on stay loaded. on_evict is called
+    for every evicted entry so unsaved changes can be written out first.
+    """
+
+    # How many of the least recently used entries are considered for eviction
+    EVICTION_CANDIDATES = 8
+
+    def __init__(self, max_entries: int = 500, max_bytes: int = 512 * 1024 * 1024,
+                 on_evict: Optional[Callable[[str, Dict], None]] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self.memory_bytes = 0
+
+        self._entries = OrderedDict()  # path -> entry, least recently used first
+        self._sizes = {}  # path -> estimated bytes
+        self._hits = {}  # path -> number of lookups
+        self._lock = threading.RLock()
+
+    def get(self, path: str, default=None):
+        """Return the entry for path and mark it as recently used"""
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                return default
+            self._entries.move_to_end(path)
+            self._hits[path] += 1
+            return entry
+
+    def __setitem__(self, path: str, entry: Dict):
+        with self._lock:
+            self._discard(path)
+            self._entries[path] = entry
+            self._sizes[path] = estimate_tree_bytes(entry['tree'])
+            self._hits[path] = self._hits.get(path, 0) + 1
+            self.memory_bytes += self._sizes[path]
+            self.evict()
+
+    def __delitem__(self, path: str):
+        with self._lock:
+            if path not in self._entries:
+                raise KeyError(path)
+            self._discard(path)
+            self._hits.pop(path, None)
+
+    def __contains__(self, path) -> bool:
+        return path in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._entries))
+
+    def values(self):
+        with self._lock:
+            return list(self._entries.values())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._hits.clear()
+            self.memory_bytes = 0
+
+    def adjust(self, path: str, delta_bytes: int):
+        """Account for a tree that grew or shrank in place"""
+        with self._lock:
+            if path in self._sizes:
+                self._sizes[path] += delta_bytes
+                self.memory_bytes += delta_bytes
+                self.evict()
+
+    def evict(self):
+        """Evict entries until within budget, the most recent one always stays"""
+        with self._lock:
+            while len(self._entries) > 1 and (len(self._entries) > self.max_entries or
+                                              self.memory_bytes > self.max_bytes):
+                candidates = list(islice(self._entries, min(self.EVICTION_CANDIDATES, len(self._entries) - 1)))
+                victim = min(candidates, key=lambda p: (self._hits.get(p, 0), -len(Path(p).parts)))
+                entry = self._entries[victim]
+                self._discard(victim)
+                if self.on_evict is not None:
+                    self.on_evict(victim, entry)
+
+    def _discard(self, path: str):
+        # Lookup counts are kept so an entry loaded again keeps its history
+        if path in self._entries:
+            del self._entries[path]
+            self.memory_bytes -= self._sizes.pop(path, 0)
+
+
+def merge_largest_files(items: List[Tuple[int, str]], path: str, new_items: List[Tuple[int, str]],
+                        limit: int = 100) -> List[Tuple[int, str]]:
+    """Replace the files under path in a largest-files list with a fresh scan's"""
+    prefix = path.rstrip('/\\') + os.sep
+    kept = [item for item in items if not item[1].startswith(prefix)]
+    return sorted(kept + list(new_items), reverse=True)[:limit]
+
+
+def open_cache_store(cache_dir: Path) -> CacheStore:
+    """Open the cache database in cache_dir, migrating an old JSON cache once"""
+    store = CacheStore(Path(cache_dir) / "scan_cache.db")
+    legacy_file = Path(cache_dir) / "scan_cache.json"
+    if legacy_file.exists():
+        try:
+            store.import_json(legacy_file)
+        except (OSError, ValueError) as e:
+            print(f"Failed to import old cache: {e}")
+        legacy_file.replace(legacy_file.with_suffix('.json.bak'))
+    return store
+
@@ -0,0 +1,256 @@
+"""
+Command-line scanning for Helium
+
+Scans a path without the GUI and writes one record per folder as JSON Lines
+or CSV to stdout, for servers and scheduled jobs. Uses the same settings and
+cache directory as the GUI, so a scan from cron makes the next GUI visit
+instant and vice versa.
+
+This module must not import tkinter.
+
+Usage: python cli.py PATH [--depth N] [--workers N] [--backend threads|processes]
+                          [--format jsonl|csv] [--no-cache] [--progress]
+                          [--profile FILE]
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from cache_store import CacheStore, merge_largest_files, open_cache_store
+from scanner import ScanNode, ScanProfile, ParallelScanner, ProcessScanner, find_node, replace_node
+
+DEFAULT_CACHE_DIR = Path.home() / ".helium_cache"
+FIELDS = ['path', 'name', 'depth', 'size_bytes', 'disk_bytes', 'files', 'modified']
+
+
+def load_settings(cache_dir: Path = DEFAULT_CACHE_DIR) -> Dict:
+    """Read the GUI settings file, defaults if it is missing or unreadable"""
+    settings = {
+        'cache_dir': str(cache_dir),
+        'cache_enabled': True,
+        'max_workers': 4,
+        'scan_backend': 'threads',
+        'max_snapshots': 10,
+        'checkpoint_minutes': 5
+    }
+    try:
+        with open(cache_dir / "settings.json", 'r', encoding='utf-8') as f:
+            settings.update(json.load(f))
+    except (OSError, ValueError):
+        pass
+    return settings
+
+
+def find_previous_tree(store: CacheStore, path: str) -> Tuple[Optional[ScanNode], List[Tuple[int, str]]]:
+    """
+    Cached tree for path, either its own entry or part of an ancestor's
+    Returns: (tree or None, cached largest files inside path)
+    """
+    prefix = path.rstrip('/\\') + os.sep
+    for entry_path in [path] + [str(parent) for parent in Path(path).parents]:
+        entry = store.get(entry_path)
+        if entry is not None:
+            largest = [item for item in entry['largest_files'] if item[1].startswith(prefix)]
+            return find_node(entry['tree'], entry_path, path), largest
+    return None, []
+
+
+def save_tree(store: CacheStore, path: str, node: ScanNode, largest_files: List[Tuple[int, str]],
+              max_snapshots: int = 10):
+    """Store a scanned tree the way the GUI does, updating cached ancestors and the scan history"""
+    store.delete_under(path)
+    now = time.time()
+    entries = {path: {
+        'tree': node,
+        'timestamp': now,
+        'total_size': node.size,
+        'subdirs_count': len(node.children),
+        'largest_files': largest_files
+    }}
+    for parent in Path(path).parents:
+        entry = store.get(str(parent))
+        if entry is not None and replace_node(entry['tree'], str(parent), path, node) is not None:
+            entry['total_size'] = entry['tree'].size
+            entry['largest_files'] = merge_largest_files(entry['largest_files'], path, largest_files)
+            entries[str(parent)] = entry
+    store.put_many(entries)
+    if max_snapshots > 0:
+        store.add_snapshot(path, node, now, keep=max_snapshots)
+
+
+def save_partial_tree(store: CacheStore, path: str, node: ScanNode, largest_files: List[Tuple[int, str]]):
+    """Store the tree of a cancelled or unfinished scan, marked incomplete so it is only used to resume"""
+    store.put(path, {
+        'tree': node,
+        'timestamp': time.time(),
+        'total_size': node.size,
+        'subdirs_count': len(node.children),
+        'largest_files': largest_files,
+        'incomplete': True
+    })
+
+
+def iter_records(root: ScanNode, root_path: str, max_depth: int) -> Iterator[Dict]:
+    """Folder records in pre-order down to max_depth, children largest first"""
+    stack = [(child, os.path.join(root_path, child.name), 1) for child in reversed(root.children)]
+    while stack:
+        node, path, depth = stack.pop()
+        yield {
+            'path': path,
+            'name': node.name,
+            'depth': depth,
+            'size_bytes': node.size,
+            'disk_bytes': node.alloc,
+            'files': node.files,
+            'modified': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(node.mtime))
+        }
+        if depth < max_depth:
+            stack.extend((child, os.path.join(path, child.name), depth + 1)
+                         for child in reversed(node.children))
+
+
+def write_records(records: Iterator[Dict], output_format: str, out=sys.stdout):
+    """Write records as JSON Lines or CSV"""
+    if output_format == 'csv':
+        writer = csv.DictWriter(out, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(records)
+    else:
+        for record in records:
+            out.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def run_scan(path: str, workers: int, backend: str, previous: Optional[ScanNode],
+             show_progress: bool, profile: Optional[ScanProfile] = None,
+             previous_largest: List[Tuple[int, str]] = (), checkpoint_store: Optional[CacheStore] = None,
+             checkpoint_interval: float = 0) -> Tuple[ParallelScanner, bool]:
+    """
+    Scan path, returns the scanner and whether the scan ran to completion
+    On Ctrl+C the workers stop after their current folders and the scanner
+    holds the part of the tree that was scanned. With a checkpoint_store,
+    the finished part is also saved every checkpoint_interval seconds.
+    """
+    if previous is not None:
+        scanner = ParallelScanner(path, workers, previous, profile)
+    elif backend == 'processes':
+        scanner = ProcessScanner(path, workers, profile)
+    else:
+        scanner = ParallelScanner(path, workers, profile=profile)
+
+    scanner.largest_files.seed(previous_largest)
+    scanner.start()
+    last_checkpoint = time.monotonic()
+    try:
+        while not scanner.wait(0.5):
+            if checkpoint_store is not None and checkpoint_interval > 0 and \
+                    time.monotonic() - last_checkpoint >= checkpoint_interval:
+                node = scanner.checkpoint()
+                if node is not None:
+                    save_partial_tree(checkpoint_store, path, node, scanner.largest_files.items())
+                last_checkpoint = time.monotonic()
+            if show_progress:
+                progress = scanner.progress()
+                sys.stderr.write(f"\rScanning... {progress.top_level_done}/{progress.top_level_total} | "
+                                 f"{progress.dirs_scanned:,} folders | "
+                                 f"{progress.bytes_seen / (1024**3):.2f} GB")
+                sys.stderr.flush()
+    except KeyboardInterrupt:
+        scanner.cancel()
+        scanner.wait()
+    finally:
+        if show_progress:
+            sys.stderr.write("\n")
+    return scanner, scanner.complete
+
+
+def main(argv=None) -> int:
+    settings = load_settings()
+
+    parser = argparse.ArgumentParser(description="Scan a folder and report sizes without the GUI")
+    parser.add_argument('path', help="folder to scan")
+    parser.add_argument('--depth', type=int, default=1,
+                        help="folder levels to report below PATH (default: 1)")
+    parser.add_argument('--workers', type=int, default=settings['max_workers'],
+                        help="parallel scan workers (default: from settings)")
+    parser.add_argument('--backend', choices=['threads', 'processes'], default=settings['scan_backend'],
+                        help="scan with threads or processes; paths with a cached tree are "
+                             "rescanned with threads (default: from settings)")
+    parser.add_argument('--format', choices=['jsonl', 'csv'], default='jsonl',
+                        help="output format (default: jsonl)")
+    parser.add_argument('--cache-dir', default=settings['cache_dir'],
+                        help="cache directory shared with the GUI")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="neither reuse nor update the scan cache")
+    parser.add_argument('--progress', action='store_true', help="show progress on stderr")
+    parser.add_argument('--profile', metavar='FILE',
+                        help="write per-phase timings and the slowest folders to FILE as JSON")
+    args = parser.parse_args(argv)
+
+    # The csv module writes its own line endings, and names are not limited
+    # to the console's code page when the output goes to a file or pipe
+    if hasattr(sys.stdout, 'reconfigure'):
+        sys.stdout.reconfigure(newline='', encoding='utf-8')
+
+    path = os.path.abspath(args.path)
+    if not os.path.isdir(path):
+        print(f"Error: {path} is not a directory", file=sys.stderr)
+        return 2
+
+    store = None
+    previous = None
+    previous_largest = []
+    if settings['cache_enabled'] and not args.no_cache:
+        try:
+            store = open_cache_store(Path(args.cache_dir))
+            previous, previous_largest = find_previous_tree(store, path)
+        except Exception as e:
+            print(f"Cache unavailable, scanning without it: {e}", file=sys.stderr)
+            store = None
+
+    profile = ScanProfile() if args.profile else None
+    try:
+        scanner, completed = run_scan(path, max(1, args.workers), args.backend, previous,
+                                      args.progress, profile, previous_largest,
+                                      store, settings['checkpoint_minutes'] * 60)
+        if not completed:
+            if store is not None:
+                save_partial_tree(store, path, scanner.root, scanner.largest_files.items())
+                print("Scan cancelled, the next scan of this path continues from there", file=sys.stderr)
+            else:
+                print("Scan cancelled", file=sys.stderr)
+            return 130
+
+        if store is not None:
+            cache_started = time.perf_counter()
+            save_tree(store, path, scanner.root, scanner.largest_files.items(), settings['max_snapshots'])
+            if profile is not None:
+                profile.add('cache_write', time.perf_counter() - cache_started)
+        if profile is not None:
+            profile.dump(args.profile)
+
+        try:
+            write_records(iter_records(scanner.root, path, max(1, args.depth)), args.format)
+            sys.stdout.flush()
+        except BrokenPipeError:
+            # The reader, such as head, stopped early; point stdout at devnull
+            # so the flush at exit does not fail again
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            return 1
+        if scanner.skipped.total:
+            print(scanner.skipped.summary(), file=sys.stderr)
+        return 0
+    finally:
+        if store is not None:
+            store.close()
+
+
+if __name__ == "__main__":
+    # Needed by the process scan backend in frozen Windows builds
+    multiprocessing.freeze_support()
+    sys.exit(main())
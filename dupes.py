@@ -0,0 +1,177 @@
+"""
+Duplicate file finding for Helium
+
+Finds files with identical content under a folder in three stages, each
+only reading the files that survived the one before: equal sizes, then a
+hash of the first and last block, then a hash of the whole file. Reads run
+on a small thread pool so a slow disk is not flooded with requests, and
+hashes are kept in the cache database keyed by path, size and mtime, so
+searching again only reads files that changed.
+"""
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from scanner import SkipReport
+
+# Bytes hashed at each end of a file in the partial stage; files up to
+# twice this size are read whole, so their partial hash is the full hash
+PARTIAL_BLOCK = 16 * 1024
+READ_CHUNK = 1024 * 1024
+
+
+class DuplicateGroup:
+    """Files of one size with identical content"""
+
+    __slots__ = ('size', 'paths')
+
+    def __init__(self, size: int, paths: List[str]):
+        self.size = size
+        self.paths = paths
+
+    @property
+    def reclaimable(self) -> int:
+        """Bytes freed by keeping a single copy"""
+        return self.size * (len(self.paths) - 1)
+
+
+def hash_file(path: str, size: int, partial: bool) -> str:
+    """BLAKE2 hash of a file, or of its first and last PARTIAL_BLOCK bytes"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        if partial and size > 2 * PARTIAL_BLOCK:
+            digest.update(f.read(PARTIAL_BLOCK))
+            f.seek(size - PARTIAL_BLOCK)
+            digest.update(f.read(PARTIAL_BLOCK))
+        else:
+            for chunk in iter(lambda: f.read(READ_CHUNK), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DuplicateFinder:
+    """
+    Search one folder for duplicate files
+
+    run() blocks, so the GUI calls it from a worker thread and polls stage
+    and the counters. Hard links to the same file are not duplicates,
+    removing one frees nothing, so only one path per file is considered.
+    """
+
+    def __init__(self, path: str, store=None, io_workers: int = 4, min_size: int = 1):
+        self.path = path
+        self.store = store  # CacheStore for the hash cache, optional
+        self.io_workers = io_workers
+        self.min_size = min_size
+
+        self.skipped = SkipReport()
+        self.stage = "Listing files"
+        self.files_seen = 0
+        self.files_hashed = 0
+        self.bytes_hashed = 0
+        self.cache_hits = 0
+        self.cancelled = False
+
+        self._cached = {}  # path -> (size, mtime, partial_hash, full_hash)
+        self._new_hashes = {}  # path -> [size, mtime, partial_hash, full_hash]
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def collect_files(self) -> Dict[int, List[Tuple[str, float]]]:
+        """Walk the folder, returning size -> [(path, mtime)] for files of a shared size"""
+        by_size = {}
+        seen_inodes = set()
+        stack = [self.path]
+        while stack and not self.cancelled:
+            path = stack.pop()
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                                continue
+                            if not entry.is_file(follow_symlinks=False):
+                                continue
+                            st = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        if st.st_size < self.min_size:
+                            continue
+                        if st.st_nlink > 1:
+                            if (st.st_dev, st.st_ino) in seen_inodes:
+                                continue
+                            seen_inodes.add((st.st_dev, st.st_ino))
+                        by_size.setdefault(st.st_size, []).append((entry.path, st.st_mtime))
+                        self.files_seen += 1
+            except OSError as e:
+                self.skipped.add(e, path)
+        return {size: files for size, files in by_size.items() if len(files) > 1}
+
+    def _hash(self, path: str, size: int, mtime: float, partial: bool) -> Optional[str]:
+        """Hash of one file from the cache or the disk, None if unreadable or cancelled"""
+        slot = 2 if partial else 3
+        cached = self._cached.get(path)
+        if cached is not None and cached[0] == size and cached[1] == mtime and cached[slot]:
+            with self._lock:
+                self.cache_hits += 1
+            return cached[slot]
+        if self.cancelled:
+            return None
+        try:
+            value = hash_file(path, size, partial)
+        except OSError:
+            return None
+
+        with self._lock:
+            self.files_hashed += 1
+            self.bytes_hashed += min(size, 2 * PARTIAL_BLOCK) if partial else size
+            row = self._new_hashes.get(path)
+            if row is None:
+                row = [size, mtime, None, None]
+                if cached is not None and cached[0] == size and cached[1] == mtime:
+                    row[2], row[3] = cached[2], cached[3]
+                self._new_hashes[path] = row
+            row[slot] = value
+            if partial and size <= 2 * PARTIAL_BLOCK:
+                row[3] = value
+        return value
+
+    def _split(self, groups: List[Tuple[int, List[Tuple[str, float]]]], partial: bool,
+               executor: ThreadPoolExecutor) -> List[Tuple[int, List[Tuple[str, float]]]]:
+        """Hash every file in groups, splitting each group by hash"""
+        jobs = [(size, path, mtime) for size, files in groups for path, mtime in files]
+        hashes = executor.map(lambda job: self._hash(job[1], job[0], job[2], partial), jobs)
+        by_hash = {}
+        for (size, path, mtime), value in zip(jobs, hashes):
+            if value is not None:
+                by_hash.setdefault((size, value), []).append((path, mtime))
+        return [(size, files) for (size, _), files in by_hash.items() if len(files) > 1]
+
+    def run(self) -> List[DuplicateGroup]:
+        """Find the duplicates, largest reclaimable space first"""
+        by_size = self.collect_files()
+        if self.store is not None:
+            self._cached = self.store.get_hashes([path for files in by_size.values() for path, _ in files])
+
+        with ThreadPoolExecutor(max_workers=self.io_workers) as executor:
+            self.stage = "Comparing first and last blocks"
+            groups = self._split(list(by_size.items()), True, executor)
+            # Small files were hashed whole in the partial stage already
+            small = [(size, files) for size, files in groups if size <= 2 * PARTIAL_BLOCK]
+            large = [(size, files) for size, files in groups if size > 2 * PARTIAL_BLOCK]
+            self.stage = "Comparing full contents"
+            groups = small + self._split(large, False, executor)
+
+        if self.store is not None and self._new_hashes:
+            self.store.put_hashes({path: tuple(row) for path, row in self._new_hashes.items()})
+        if self.cancelled:
+            return []
+        self.stage = "Done"
+        result = [DuplicateGroup(size, sorted(path for path, _ in files)) for size, files in groups]
+        result.sort(key=lambda group: group.reclaimable, reverse=True)
+        return result
@@ -0,0 +1,417 @@
+"""
+Background file operations for Helium
+
+Deletes, moves and compresses files and folders off the UI thread, one
+directory entry at a time, so progress can be shown and a running job
+stops promptly when cancelled. Jobs run from a JobQueue with a bounded
+number at a time, and each reports exactly what it removed and which
+folders gained entries, which lets the cached trees be patched instead
+of rescanned.
+"""
+import errno
+import itertools
+import os
+import shutil
+import stat
+import threading
+import zipfile
+from collections import deque
+from typing import Callable, List, Optional
+
+from scanner import allocated_size
+
+_job_ids = itertools.count(1)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job to stop it between files"""
+
+
+class Job:
+    """
+    Base class: one batch operation on a list of paths
+
+    removed lists the paths that are gone completely as (path, size,
+    on-disk size, is_dir); sizes are only known for files, folder sizes
+    come from the scan, and are None for symlinks and other entries scans
+    do not count. Folders left partly changed, by an error or by
+    cancelling, are listed in partial and folders that gained entries in
+    changed_dirs; both are walked again afterwards.
+    """
+
+    title = "Job"
+
+    def __init__(self, paths: List[str], expected_bytes: int = 0):
+        self.id = next(_job_ids)  # stable, for display
+        self.paths = paths
+        self.expected_bytes = expected_bytes  # from the scan, for the progress bar
+        self.state = 'queued'  # 'queued', 'running', 'done' or 'cancelled'
+        self.current_path = ""
+        self.files_done = 0
+        self.dirs_done = 0
+        self.bytes_done = 0
+        self.removed = []  # (path, size, alloc, is_dir)
+        self.partial = []  # folder paths
+        self.changed_dirs = set()  # folder paths
+        self.errors = []  # (path, message)
+        self.cancelled = False
+        self.done = threading.Event()
+
+    @property
+    def percent(self) -> float:
+        if self.done.is_set():
+            return 100.0
+        if self.expected_bytes <= 0:
+            return 0.0
+        return min(100.0, self.bytes_done * 100.0 / self.expected_bytes)
+
+    def cancel(self):
+        """Stop after the entry being processed, finished work stays done"""
+        self.cancelled = True
+
+    def run(self):
+        self.state = 'running'
+        try:
+            for path in self.paths:
+                if self.cancelled:
+                    break
+                self.process(path)
+        finally:
+            self.state = 'cancelled' if self.cancelled else 'done'
+            self.done.set()
+
+    def process(self, path: str):
+        """Handle one of the paths"""
+        raise NotImplementedError
+
+    def describe(self) -> str:
+        """What the job does, such as 'Delete 12 items'"""
+        return f"{self.title} {len(self.paths):,} item{'s' if len(self.paths) != 1 else ''}"
+
+    def targets(self) -> List[str]:
+        """Paths the job changes, including where it puts things"""
+        return list(self.paths)
+
+    def touches(self, path: str) -> bool:
+        """Whether path is a target, lies inside one or contains one"""
+        path = os.path.normcase(os.path.abspath(path))
+        for target in self.targets():
+            target = os.path.normcase(os.path.abspath(target))
+            try:
+                common = os.path.commonpath([path, target])
+            except ValueError:  # different drives
+                continue
+            if common in (path, target):
+                return True
+        return False
+
+    def summary(self) -> str:
+        """Short progress description such as '1,024 files in 12 folders (2.10 GB)'"""
+        text = (f"{self.files_done:,} files in {self.dirs_done:,} folders "
+                f"({self.bytes_done / (1024**3):.2f} GB)")
+        if self.cancelled:
+            text += ", cancelled"
+        if self.errors:
+            text += f", {len(self.errors):,} failed"
+        return text
+
+    def _error(self, path: str, error: OSError):
+        self.errors.append((path, error.strerror or str(error)))
+
+    def _record_removed(self, path: str, st: os.stat_result):
+        if stat.S_ISDIR(st.st_mode):
+            self.removed.append((path, 0, 0, True))
+        elif not stat.S_ISREG(st.st_mode):
+            self.removed.append((path, None, None, False))
+        else:
+            # Other links keep the data on disk
+            self.removed.append((path, st.st_size, allocated_size(st) if st.st_nlink == 1 else 0, False))
+
+    def _remove(self, path: str, count: bool = True) -> bool:
+        """
+        Delete a file or a whole folder, bottom up, recording it in removed
+        or partial; with count set, deleted files add to the progress
+        Returns: True if path is gone
+        """
+        try:
+            st = os.lstat(path)
+        except OSError as e:
+            self._error(path, e)
+            return False
+
+        if not stat.S_ISDIR(st.st_mode):
+            self.current_path = path
+            try:
+                os.unlink(path)
+            except OSError as e:
+                self._error(path, e)
+                return False
+            if count:
+                self.files_done += 1
+                self.bytes_done += st.st_size if stat.S_ISREG(st.st_mode) else 0
+            self._record_removed(path, st)
+            return True
+
+        if self._remove_tree(path, count):
+            self._record_removed(path, st)
+            return True
+        self.partial.append(path)
+        return False
+
+    def _remove_tree(self, path: str, count: bool) -> bool:
+        stack = [(path, False)]  # (directory, already emptied)
+        while stack and not self.cancelled:
+            current, emptied = stack.pop()
+            if emptied:
+                try:
+                    os.rmdir(current)
+                    if count:
+                        self.dirs_done += 1
+                except OSError as e:
+                    # A folder left non-empty by an earlier error is not news
+                    if e.errno not in (errno.ENOTEMPTY, errno.EEXIST) or not self.errors:
+                        self._error(current, e)
+                continue
+
+            self.current_path = current
+            stack.append((current, True))
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        if self.cancelled:
+                            break
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append((entry.path, False))
+                                continue
+                            size = entry.stat(follow_symlinks=False).st_size
+                            os.unlink(entry.path)
+                        except OSError as e:
+                            self._error(entry.path, e)
+                            continue
+                        if count:
+                            self.files_done += 1
+                            self.bytes_done += size
+            except OSError as e:
+                self._error(current, e)
+        return not os.path.lexists(path)
+
+
+class DeleteJob(Job):
+    """Delete files and folders"""
+
+    title = "Delete"
+
+    def process(self, path: str):
+        self._remove(path)
+
+
+class MoveJob(Job):
+    """
+    Move files and folders into a destination folder, e.g. an archive disk
+    Within one filesystem this is a rename; otherwise the data is copied
+    and the original removed once its copy is complete
+    """
+
+    title = "Move"
+
+    def __init__(self, paths: List[str], destination: str, expected_bytes: int = 0):
+        super().__init__(paths, expected_bytes)
+        self.destination = destination
+        self._moved = 0
+
+    def describe(self) -> str:
+        return f"{super().describe()} to {self.destination}"
+
+    def targets(self) -> List[str]:
+        return super().targets() + [self.destination]
+
+    def process(self, path: str):
+        target = os.path.join(self.destination, os.path.basename(os.path.normpath(path)))
+        if os.path.lexists(target):
+            self.errors.append((path, f"{target} already exists"))
+            return
+        try:
+            st = os.lstat(path)
+        except OSError as e:
+            self._error(path, e)
+            return
+
+        self.current_path = path
+        try:
+            shutil.move(path, target, copy_function=self._copy)
+        except JobCancelled:
+            # The original is only removed after a complete copy
+            self._discard(target)
+            return
+        except (OSError, shutil.Error) as e:
+            self.errors.append((path, str(e)))
+            if os.path.lexists(target):
+                self.changed_dirs.add(self.destination)
+            if stat.S_ISDIR(st.st_mode) and os.path.lexists(path):
+                self.partial.append(path)
+            return
+
+        self.changed_dirs.add(self.destination)
+        self._record_removed(path, st)
+        self._moved += 1
+        if stat.S_ISDIR(st.st_mode):
+            self.dirs_done += 1
+        # Renames copy nothing, so progress also steps by the share of paths moved
+        if self.expected_bytes > 0:
+            self.bytes_done = max(self.bytes_done, self.expected_bytes * self._moved // len(self.paths))
+
+    def _copy(self, src: str, dst: str, *, follow_symlinks: bool = True):
+        if self.cancelled:
+            raise JobCancelled()
+        self.current_path = src
+        shutil.copy2(src, dst, follow_symlinks=follow_symlinks)
+        self.files_done += 1
+        self.bytes_done += os.lstat(src).st_size
+        return dst
+
+    @staticmethod
+    def _discard(target: str):
+        if os.path.isdir(target) and not os.path.islink(target):
+            shutil.rmtree(target, ignore_errors=True)
+        else:
+            try:
+                os.unlink(target)
+            except OSError:
+                pass
+
+
+class CompressJob(Job):
+    """
+    Replace files and folders with zip archives next to them
+    The original is only removed once its archive is complete, and is kept
+    if it holds symlinks or other entries a zip archive cannot restore
+    """
+
+    title = "Compress"
+
+    def process(self, path: str):
+        path = os.path.normpath(path)
+        archive = path + '.zip'
+        if os.path.lexists(archive):
+            self.errors.append((path, f"{archive} already exists"))
+            return
+
+        base = os.path.dirname(path)
+        complete = True
+        try:
+            # Files dated before 1980, which zip cannot store, are stored as 1980
+            with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED, allowZip64=True,
+                                 strict_timestamps=False) as zf:
+                if os.path.isdir(path) and not os.path.islink(path):
+                    complete = self._add_tree(zf, path, base)
+                else:
+                    self._add_file(zf, path, base)
+        except JobCancelled:
+            self._discard(archive)
+            return
+        except OSError as e:
+            self._error(path, e)
+            self._discard(archive)
+            return
+        except Exception as e:
+            self.errors.append((path, str(e)))
+            self._discard(archive)
+            return
+
+        self.changed_dirs.add(base)
+        if complete:
+            self._remove(path, count=False)
+        else:
+            self.errors.append((path, "holds links or special files, original kept next to the archive"))
+
+    def _add_tree(self, zf: zipfile.ZipFile, path: str, base: str) -> bool:
+        """Add a folder, False if some entries could not be archived"""
+        complete = True
+        stack = [path]
+        while stack:
+            current = stack.pop()
+            self.current_path = current
+            with os.scandir(current) as entries:
+                entries = sorted(entries, key=lambda e: e.name)
+            zf.write(current, os.path.relpath(current, base))
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    self._add_file(zf, entry.path, base)
+                else:
+                    complete = False
+            self.dirs_done += 1
+        return complete
+
+    def _add_file(self, zf: zipfile.ZipFile, path: str, base: str):
+        if self.cancelled:
+            raise JobCancelled()
+        self.current_path = path
+        zf.write(path, os.path.relpath(path, base))
+        self.files_done += 1
+        self.bytes_done += os.lstat(path).st_size
+
+    @staticmethod
+    def _discard(archive: str):
+        try:
+            os.unlink(archive)
+        except OSError:
+            pass
+
+
+class JobQueue:
+    """
+    Run jobs in the order they were added, at most max_running at a time
+    on_done is called from the worker thread once a job has finished, also
+    when it failed, so what it did change is still patched into the cache
+    """
+
+    def __init__(self, max_running: int = 2):
+        self.max_running = max_running
+        self.jobs = []  # every job added, for display
+        self._pending = deque()  # (job, on_done)
+        self._running = 0
+        self._lock = threading.Lock()
+
+    def submit(self, job: Job, on_done: Optional[Callable[[Job], None]] = None):
+        with self._lock:
+            self.jobs.append(job)
+            self._pending.append((job, on_done))
+            self._start_next()
+
+    def _start_next(self):
+        # Called with the lock held
+        while self._running < self.max_running and self._pending:
+            job, on_done = self._pending.popleft()
+            self._running += 1
+            threading.Thread(target=self._run, args=(job, on_done), daemon=True).start()
+
+    def _run(self, job: Job, on_done: Optional[Callable[[Job], None]]):
+        try:
+            job.run()
+        except Exception as e:
+            job.errors.append((job.current_path or job.describe(), f"job failed: {e}"))
+        finally:
+            try:
+                if on_done is not None:
+                    on_done(job)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._start_next()
+
+    def active(self) -> List[Job]:
+        """Jobs queued or running"""
+        with self._lock:
+            return [job for job in self.jobs if not job.done.is_set()]
+
+    def cancel_all(self):
+        for job in self.active():
+            job.cancel()
+
+    def clear_finished(self):
+        """Forget finished jobs, keeping the queued and running ones"""
+        with self._lock:
+            self.jobs = [job for job in self.jobs if not job.done.is_set()]
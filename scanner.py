@@ -0,0 +1,1367 @@
+"""
+Scan engine for Helium
+
+Walks a directory tree once and keeps the result as an in-memory tree of
+ScanNode objects with sizes and file counts rolled up at every depth, so any
+level of the tree can be browsed without walking the disk again. A previous
+tree can be passed back in to rescan only the directories that changed.
+
+This module must not import tkinter.
+"""
+import errno
+import heapq
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import stat
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+# File type categories for the size breakdown, by lowercase extension.
+# Anything else counts as Other. Cached trees store totals by position in
+# this list, so add new categories at the end.
+FILE_CATEGORIES = [
+    ('Video', 'mp4 mkv avi mov wmv flv webm m4v mpg mpeg'),
+    ('Audio', 'mp3 wav flac aac ogg m4a wma opus'),
+    ('Images', 'jpg jpeg png gif bmp tif tiff webp heic raw cr2 nef svg psd'),
+    ('Documents', 'pdf doc docx xls xlsx ppt pptx odt ods odp txt rtf md csv'),
+    ('Archives', 'zip rar 7z tar gz tgz bz2 xz zst cab'),
+    ('Logs', 'log'),
+    ('Code', 'py js ts c h cpp hpp cs java go rs rb php html css json xml yml yaml sh bat ps1'),
+    ('Programs', 'exe dll so dylib msi sys bin o a lib jar whl'),
+    ('Disk Images', 'iso dmg img vhd vhdx vmdk vdi qcow2'),
+    ('Databases', 'db sqlite sqlite3 mdb accdb mdf ldf'),
+]
+CATEGORY_NAMES = [name for name, _ in FILE_CATEGORIES] + ['Other']
+OTHER_CATEGORY = len(FILE_CATEGORIES)
+EXTENSION_CATEGORIES = {ext: index for index, (_, extensions) in enumerate(FILE_CATEGORIES)
+                        for ext in extensions.split()}
+_TYPE_SLOTS = len(CATEGORY_NAMES)
+
+
+# Windows stat results have no st_blocks, on-disk size falls back to st_size there
+_HAS_BLOCKS = hasattr(os.stat_result, 'st_blocks')
+
+
+def allocated_size(st: os.stat_result) -> int:
+    """Bytes allocated on disk for a stat result"""
+    return st.st_blocks * 512 if _HAS_BLOCKS else st.st_size
+
+
+def file_category(name: str) -> int:
+    """Index into CATEGORY_NAMES for a file name"""
+    _, dot, ext = name.rpartition('.')
+    return EXTENSION_CATEGORIES.get(ext.lower(), OTHER_CATEGORY) if dot else OTHER_CATEGORY
+
+
+class ScanNode:
+    """
+    A scanned directory with size and file count rolled up from its subtree
+
+    size is the apparent size, the sum of file lengths. alloc is the space
+    actually used on disk: allocated blocks, so sparse files count for what
+    they occupy, and files with several hard links counted once per scan.
+
+    types holds the bytes per file category followed by the file count per
+    category, also rolled up, or None while no files were seen.
+    """
+    __slots__ = ('name', 'size', 'files', 'mtime', 'ino', 'children', 'types', 'alloc')
+
+    def __init__(self, name: str, size: int = 0, files: int = 0, mtime: float = 0.0,
+                 ino: int = 0, children: Optional[List['ScanNode']] = None,
+                 types: Optional[List[int]] = None, alloc: int = 0):
+        self.name = name
+        self.size = size
+        self.files = files
+        self.mtime = mtime
+        self.ino = ino
+        self.children = children if children is not None else []
+        self.types = types
+        self.alloc = alloc
+
+    def add_file(self, name: str, size: int, alloc: int):
+        """Count a file directly in this directory"""
+        if self.types is None:
+            self.types = [0] * (2 * _TYPE_SLOTS)
+        category = file_category(name)
+        self.types[category] += size
+        self.types[_TYPE_SLOTS + category] += 1
+        self.size += size
+        self.alloc += alloc
+        self.files += 1
+
+    def add_subtree(self, child: 'ScanNode', sign: int = 1):
+        """Add (or with sign -1 remove) a subtree's rolled-up totals"""
+        self.size += sign * child.size
+        self.files += sign * child.files
+        self.alloc += sign * child.alloc
+        self.add_types(child.types, sign)
+
+    def add_types(self, types: Optional[List[int]], sign: int = 1):
+        """Add (or with sign -1 remove) another node's category totals"""
+        if types is None:
+            return
+        if self.types is None:
+            self.types = [0] * (2 * _TYPE_SLOTS)
+        own = self.types
+        for index, value in enumerate(types):
+            own[index] += sign * value
+
+    def own_types(self) -> Optional[List[int]]:
+        """Category totals of the files directly in this directory"""
+        if self.types is None:
+            return None
+        own = list(self.types)
+        for child in self.children:
+            if child.types is not None:
+                for index, value in enumerate(child.types):
+                    own[index] -= value
+        return own
+
+    def type_breakdown(self) -> List[Tuple[str, int, int]]:
+        """(category, bytes, files) for every category with files, largest first"""
+        if self.types is None:
+            return []
+        rows = [(CATEGORY_NAMES[index], self.types[index], self.types[_TYPE_SLOTS + index])
+                for index in range(_TYPE_SLOTS) if self.types[_TYPE_SLOTS + index]]
+        rows.sort(key=lambda row: row[1], reverse=True)
+        return rows
+
+    def same_listing(self, other: 'ScanNode') -> bool:
+        """
+        True if other is the same directory with an unchanged listing
+        Adding, removing or renaming an entry updates the directory mtime,
+        so its own files and subfolder names can be reused
+        """
+        return self.ino == other.ino and self.mtime == other.mtime and self.ino != 0
+
+    def own_totals(self) -> Tuple[int, int, int]:
+        """Size, count and on-disk size of the files directly in this directory"""
+        size = self.size - sum(child.size for child in self.children)
+        files = self.files - sum(child.files for child in self.children)
+        alloc = self.alloc - sum(child.alloc for child in self.children)
+        return size, files, alloc
+
+    def get_child(self, name: str) -> Optional['ScanNode']:
+        """Return the direct child with the given name, if any"""
+        for child in self.children:
+            if child.name == name:
+                return child
+        return None
+
+    def copy(self) -> 'ScanNode':
+        """Deep copy of the subtree, for trees that must not share nodes"""
+        root = ScanNode(self.name, self.size, self.files, self.mtime, self.ino, None,
+                        list(self.types) if self.types is not None else None, self.alloc)
+        stack = [(self, root)]
+        while stack:
+            node, clone = stack.pop()
+            for child in node.children:
+                child_clone = ScanNode(child.name, child.size, child.files, child.mtime, child.ino, None,
+                                       list(child.types) if child.types is not None else None, child.alloc)
+                clone.children.append(child_clone)
+                stack.append((child, child_clone))
+        return root
+
+    def to_arrays(self) -> Dict[str, list]:
+        """
+        Flatten the subtree into parallel pre-order arrays of numbers plus a
+        table of distinct names; the compact form used on disk and between
+        processes
+        """
+        names = {}
+        name_ids, sizes, allocs, files, mtimes, inos, child_counts, types = [], [], [], [], [], [], [], []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            name_ids.append(names.setdefault(node.name, len(names)))
+            sizes.append(node.size)
+            allocs.append(node.alloc)
+            files.append(node.files)
+            mtimes.append(node.mtime)
+            inos.append(node.ino)
+            child_counts.append(len(node.children))
+            types.append(node.types)
+            stack.extend(reversed(node.children))
+        return {
+            'names': list(names),
+            'name': name_ids,
+            'size': sizes,
+            'alloc': allocs,
+            'files': files,
+            'mtime': mtimes,
+            'ino': inos,
+            'children': child_counts,
+            'types': types
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, list]) -> 'ScanNode':
+        """Rebuild a subtree from the arrays produced by to_arrays()"""
+        names = [sys.intern(name) for name in arrays['names']]
+        # Trees cached before the type breakdown and on-disk sizes lack them,
+        # scan history snapshots also leave out mtimes and inodes
+        count = len(arrays['name'])
+        types = arrays.get('types') or [None] * count
+        allocs = arrays.get('alloc') or arrays['size']
+        mtimes = arrays.get('mtime') or [0.0] * count
+        inos = arrays.get('ino') or [0] * count
+        records = zip((names[i] for i in arrays['name']), arrays['size'], arrays['files'],
+                      mtimes, inos, arrays['children'], types, allocs)
+        return cls._build(records)
+
+    @classmethod
+    def from_list(cls, records: List[list]) -> 'ScanNode':
+        """
+        Rebuild a subtree from pre-order [name, size, files, mtime, ino,
+        child_count] records, the format of older caches
+        """
+        def normalized():
+            for record in records:
+                if len(record) == 5:
+                    # Caches without inodes, those directories are rescanned
+                    name, size, files, mtime, child_count = record
+                    yield sys.intern(name), size, files, mtime, 0, child_count, None, size
+                else:
+                    name, size, files, mtime, ino, child_count = record
+                    yield sys.intern(name), size, files, mtime, ino, child_count, None, size
+
+        return cls._build(normalized())
+
+    @classmethod
+    def _build(cls, records) -> 'ScanNode':
+        """
+        Link pre-order (name, size, files, mtime, ino, child_count, types,
+        alloc) records into a tree
+        """
+        root = None
+        stack = []  # [node, children still to attach]
+        for name, size, files, mtime, ino, child_count, types, alloc in records:
+            node = cls(name, size, files, mtime, ino, types=types, alloc=alloc)
+            if stack:
+                parent = stack[-1]
+                parent[0].children.append(node)
+                parent[1] -= 1
+                if parent[1] == 0:
+                    stack.pop()
+            else:
+                root = node
+            if child_count:
+                stack.append([node, child_count])
+        return root
+
+
+# Approximate bytes held by one ScanNode: the object, its children list,
+# its name string and its number objects, plus its category totals if any
+_NODE_BYTES = (sys.getsizeof(ScanNode('')) + sys.getsizeof([]) + sys.getsizeof('') +
+               4 * sys.getsizeof(2**40) + sys.getsizeof(0.0))
+_TYPES_BYTES = sys.getsizeof([0] * (2 * _TYPE_SLOTS)) + _TYPE_SLOTS * sys.getsizeof(2**40)
+
+
+def estimate_tree_bytes(node: ScanNode) -> int:
+    """Estimate the memory used by a node tree"""
+    total = 0
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        total += _NODE_BYTES + len(current.name) + 8 * len(current.children)
+        if current.types is not None:
+            total += _TYPES_BYTES
+        stack.extend(current.children)
+    return total
+
+
+class SkipReport:
+    """Counts of directories that could not be scanned, grouped by reason"""
+
+    def __init__(self):
+        self.counts = {}    # reason -> number of directories
+        self.examples = {}  # reason -> first path skipped for that reason
+        self._lock = threading.Lock()
+
+    def add(self, error: OSError, path: str):
+        """Record a directory skipped because of error"""
+        reason = skip_reason(error)
+        with self._lock:
+            self.counts[reason] = self.counts.get(reason, 0) + 1
+            self.examples.setdefault(reason, path)
+
+    def merge(self, counts: dict, examples: dict):
+        """Add counts collected elsewhere, e.g. in a worker process"""
+        with self._lock:
+            for reason, count in counts.items():
+                self.counts[reason] = self.counts.get(reason, 0) + count
+            for reason, path in examples.items():
+                self.examples.setdefault(reason, path)
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def summary(self) -> str:
+        """Short description such as 'Skipped 3 folders (permission denied: 3)'"""
+        if not self.counts:
+            return "No folders skipped"
+        reasons = ", ".join(f"{reason}: {count:,}" for reason, count in
+                            sorted(self.counts.items(), key=lambda item: item[1], reverse=True))
+        return f"Skipped {self.total:,} folders ({reasons})"
+
+
+class ScanProfile:
+    """
+    Opt-in timing of where a scan spends its time
+
+    Phase times are summed over all workers, so with several workers they
+    add up to more than the wall time. Also keeps the slowest directories,
+    which is how a slow network share or huge folder shows up.
+    """
+
+    PHASES = ('scandir', 'stat', 'aggregation', 'cache_write', 'ui_update')
+
+    def __init__(self, slowest_count: int = 10):
+        self.slowest_count = slowest_count
+        self.phases = dict.fromkeys(self.PHASES, 0.0)
+        self.slowest = []  # min-heap of (seconds, path)
+        self._lock = threading.Lock()
+
+    def add(self, phase: str, seconds: float):
+        with self._lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def add_directory(self, path: str, seconds: float, stat_seconds: float):
+        """Record one listed directory; the time not spent in stat is scandir"""
+        with self._lock:
+            self.phases['scandir'] += seconds - stat_seconds
+            self.phases['stat'] += stat_seconds
+            self._keep_slowest(seconds, path)
+
+    def merge(self, phases: dict, slowest: list):
+        """Add timings collected elsewhere, e.g. in a worker process"""
+        with self._lock:
+            for phase, seconds in phases.items():
+                self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+            for seconds, path in slowest:
+                self._keep_slowest(seconds, path)
+
+    def _keep_slowest(self, seconds: float, path: str):
+        if len(self.slowest) < self.slowest_count:
+            heapq.heappush(self.slowest, (seconds, path))
+        elif seconds > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (seconds, path))
+
+    def slowest_directories(self) -> List[Tuple[float, str]]:
+        """Slowest directories first, as (seconds, path)"""
+        with self._lock:
+            return sorted(self.slowest, reverse=True)
+
+    def summary(self, limit: int = 3) -> str:
+        """Phase times and the slowest directories in two lines"""
+        with self._lock:
+            phases = " | ".join(f"{phase.replace('_', ' ')} {seconds:.2f}s"
+                                for phase, seconds in self.phases.items())
+        slowest = ", ".join(f"{path} {seconds:.2f}s" for seconds, path in self.slowest_directories()[:limit])
+        return f"Time: {phases}\nSlowest: {slowest or '-'}"
+
+    def dump(self, file_path: str):
+        """Write all timings to a JSON file"""
+        with self._lock:
+            data = {'phases': dict(self.phases)}
+        data['slowest'] = [{'path': path, 'seconds': seconds}
+                           for seconds, path in self.slowest_directories()]
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+
+
+class HardLinks:
+    """
+    Files with more than one hard link seen during a scan, so each counts
+    once towards on-disk usage. Only multiply-linked files are remembered,
+    which keeps the set small on ordinary trees.
+
+    With record set, every claimed file is also listed with the node it was
+    counted in, so a worker process can report them for deduplication
+    against the rest of the scan.
+    """
+
+    def __init__(self, record: bool = False):
+        self.claimed = [] if record else None  # (dev, ino, node, alloc)
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def claim(self, dev: int, ino: int, node: Optional['ScanNode'] = None, alloc: int = 0) -> bool:
+        """True the first time a file is seen, False for further links to it"""
+        key = (dev, ino)
+        with self._lock:
+            if key in self._seen:
+                return False
+            self._seen.add(key)
+        if self.claimed is not None:
+            self.claimed.append((dev, ino, node, alloc))
+        return True
+
+
+class LargestFiles:
+    """
+    The largest files seen during a scan, kept in a bounded min-heap
+
+    Workers compare each file against threshold without locking and only
+    call offer() for files that would make the list, so the cost per file
+    is one comparison once the heap is full.
+    """
+
+    def __init__(self, limit: int = 100):
+        self.limit = limit
+        self.threshold = -1  # files must be larger than this to get in
+        self._heap = []  # (size, path)
+        self._lock = threading.Lock()
+
+    def offer(self, size: int, path: str):
+        with self._lock:
+            if len(self._heap) < self.limit:
+                heapq.heappush(self._heap, (size, path))
+            elif size > self._heap[0][0]:
+                heapq.heapreplace(self._heap, (size, path))
+            if len(self._heap) >= self.limit:
+                self.threshold = self._heap[0][0]
+
+    def merge(self, items: List[Tuple[int, str]]):
+        """Add files collected elsewhere, e.g. in a worker process"""
+        for size, path in items:
+            if size > self.threshold:
+                self.offer(size, path)
+
+    def seed(self, items: List[Tuple[int, str]]):
+        """
+        Start from an earlier scan's list, for refreshes that do not list
+        unchanged folders again. Each file is stat'ed so sizes are current.
+        """
+        for _, path in items:
+            try:
+                st = os.stat(path, follow_symlinks=False)
+            except OSError:
+                continue
+            if stat.S_ISREG(st.st_mode) and st.st_size > self.threshold:
+                self.offer(st.st_size, path)
+
+    def items(self) -> List[Tuple[int, str]]:
+        """(size, path) pairs, largest first, each path once"""
+        with self._lock:
+            heap = list(self._heap)
+        seen = set()
+        result = []
+        for size, path in sorted(heap, reverse=True):
+            if path not in seen:
+                seen.add(path)
+                result.append((size, path))
+        return result
+
+
+def skip_reason(error: OSError) -> str:
+    """Map an OSError to a short human readable reason"""
+    if isinstance(error, PermissionError):
+        return "permission denied"
+    if isinstance(error, (FileNotFoundError, NotADirectoryError)):
+        return "vanished during scan"
+    if error.errno == errno.ELOOP:
+        return "symlink loop"
+    if error.errno == errno.ENAMETOOLONG:
+        return "path too long"
+    return errno.errorcode.get(error.errno, "I/O error") if error.errno else "I/O error"
+
+
+def list_directory(node: ScanNode, path: str, skipped: Optional[SkipReport] = None,
+                   profile: Optional[ScanProfile] = None, largest: Optional[LargestFiles] = None,
+                   links: Optional[HardLinks] = None):
+    """
+    List one directory: add its files to node and create nodes for its
+    subfolders, offering big files to largest. Extra links to a file
+    already claimed in links take no on-disk space. The directory handle is
+    closed before returning.
+    Returns: (child_nodes, entries_seen)
+    """
+    children = []
+    entries_seen = 0
+    started = time.perf_counter() if profile is not None else 0.0
+    stat_time = 0.0
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                entries_seen += 1
+                try:
+                    is_file = entry.is_file(follow_symlinks=False)
+                    if not is_file and not entry.is_dir(follow_symlinks=False):
+                        continue
+                    if profile is None:
+                        st = entry.stat(follow_symlinks=False)
+                    else:
+                        stat_started = time.perf_counter()
+                        st = entry.stat(follow_symlinks=False)
+                        stat_time += time.perf_counter() - stat_started
+
+                    if is_file:
+                        alloc = allocated_size(st)
+                        if st.st_nlink > 1 and links is not None and \
+                                not links.claim(st.st_dev, st.st_ino, node, alloc):
+                            alloc = 0
+                        node.add_file(entry.name, st.st_size, alloc)
+                        if largest is not None and st.st_size > largest.threshold:
+                            largest.offer(st.st_size, entry.path)
+                    else:
+                        # Directories count their own blocks, as du does
+                        children.append(ScanNode(sys.intern(entry.name), mtime=st.st_mtime,
+                                                 ino=entry.inode(), alloc=allocated_size(st)))
+                except OSError as e:
+                    if skipped is not None and _is_dir_entry(entry):
+                        skipped.add(e, entry.path)
+                    continue
+    except OSError as e:
+        if skipped is not None:
+            skipped.add(e, path)
+    if profile is not None:
+        profile.add_directory(path, time.perf_counter() - started, stat_time)
+    return children, entries_seen
+
+
+def revisit_directory(node: ScanNode, path: str, old: ScanNode,
+                      skipped: Optional[SkipReport] = None,
+                      profile: Optional[ScanProfile] = None) -> List[ScanNode]:
+    """
+    Fill node for a directory whose listing is unchanged since old was scanned
+    Reuses the old file totals and only stats the known subfolders, which
+    still have to be visited because changes deeper down do not show here
+    """
+    started = time.perf_counter() if profile is not None else 0.0
+    node.size, node.files, node.alloc = old.own_totals()
+    node.types = old.own_types()
+    children = []
+    for old_child in old.children:
+        child_path = os.path.join(path, old_child.name)
+        try:
+            st = os.stat(child_path, follow_symlinks=False)
+        except OSError as e:
+            if skipped is not None:
+                skipped.add(e, child_path)
+            continue
+        if stat.S_ISDIR(st.st_mode):
+            children.append(ScanNode(old_child.name, mtime=st.st_mtime, ino=st.st_ino,
+                                     alloc=allocated_size(st)))
+    if profile is not None:
+        elapsed = time.perf_counter() - started
+        profile.add_directory(path, elapsed, elapsed)
+    return children
+
+
+def _is_dir_entry(entry: os.DirEntry) -> bool:
+    try:
+        return entry.is_dir(follow_symlinks=False)
+    except OSError:
+        return False
+
+
+def scan_tree(path: str, name: Optional[str] = None, skipped: Optional[SkipReport] = None,
+              profile: Optional[ScanProfile] = None, largest: Optional[LargestFiles] = None,
+              links: Optional[HardLinks] = None,
+              cancelled: Optional[Callable[[], bool]] = None) -> ScanNode:
+    """
+    Walk the directory at path once and return its node tree
+    Includes hidden files and folders, does not follow symlinks
+
+    Uses an explicit stack instead of recursion, so deep trees cannot hit the
+    recursion limit, and only directories still to be listed are kept pending.
+
+    cancelled is checked before each directory; once it returns True the
+    walk stops and the tree holds what was listed so far, with the folders
+    left unlisted marked by inode 0 so same_listing() never reuses them.
+    """
+    root = ScanNode(name or os.path.basename(os.path.normpath(path)) or path)
+    try:
+        st = os.stat(path)
+        root.mtime, root.ino, root.alloc = st.st_mtime, st.st_ino, allocated_size(st)
+    except OSError:
+        pass
+
+    stack = [(root, path)]
+    visited = []  # pre-order, so reversed it lists children before parents
+    while stack:
+        if cancelled is not None and cancelled():
+            for node, _ in stack:
+                node.ino = 0
+            break
+        node, dir_path = stack.pop()
+        children, _ = list_directory(node, dir_path, skipped, profile, largest, links)
+        node.children = children
+        visited.append(node)
+        for child in children:
+            stack.append((child, os.path.join(dir_path, child.name)))
+
+    # Roll sizes up from the leaves
+    started = time.perf_counter()
+    for node in reversed(visited):
+        for child in node.children:
+            node.add_subtree(child)
+        # Keep children sorted by size so drill-down needs no extra work
+        node.children.sort(key=lambda c: c.size, reverse=True)
+    if profile is not None:
+        profile.add('aggregation', time.perf_counter() - started)
+
+    return root
+
+
+def rescan_directory(path: str, old: Optional[ScanNode]) -> Optional[ScanNode]:
+    """
+    List one directory again after a change notification
+    Subfolders that still exist keep their old subtree, new ones are walked
+    Returns None if the directory is gone
+    """
+    name = old.name if old is not None else os.path.basename(os.path.normpath(path)) or path
+    node = ScanNode(name)
+    try:
+        st = os.stat(path)
+        node.mtime, node.ino, node.alloc = st.st_mtime, st.st_ino, allocated_size(st)
+    except OSError:
+        return None
+
+    children, _ = list_directory(node, path, links=HardLinks())
+    old_by_name = {child.name: child for child in old.children} if old is not None else {}
+    for index, child in enumerate(children):
+        previous = old_by_name.get(child.name)
+        if previous is not None and previous.ino == child.ino:
+            children[index] = previous
+        else:
+            children[index] = scan_tree(os.path.join(path, child.name), child.name)
+
+    for child in children:
+        node.add_subtree(child)
+    children.sort(key=lambda c: c.size, reverse=True)
+    node.children = children
+    return node
+
+
+def iter_directories(node: ScanNode, path: str, limit: int) -> List[str]:
+    """Paths of up to limit directories of the tree, shallowest first"""
+    paths = []
+    level = [(node, path)]
+    while level and len(paths) < limit:
+        next_level = []
+        for current, current_path in level:
+            paths.append(current_path)
+            if len(paths) >= limit:
+                break
+            next_level.extend((child, os.path.join(current_path, child.name)) for child in current.children)
+        level = next_level
+    return paths
+
+
+class WorkerStats:
+    """Per-worker counters used to report scanner utilization"""
+    __slots__ = ('dirs', 'reused', 'entries', 'busy_time')
+
+    def __init__(self):
+        self.dirs = 0
+        self.reused = 0
+        self.entries = 0
+        self.busy_time = 0.0
+
+
+class ScanProgress:
+    """
+    Consistent snapshot of a running scan's counters
+
+    Workers only bump counters; the UI takes one of these at its own frame
+    rate, so progress reporting costs nothing per directory.
+    """
+    __slots__ = ('dirs_scanned', 'files_seen', 'bytes_seen', 'top_level_done',
+                 'top_level_total', 'current_path', 'elapsed')
+
+    def __init__(self, dirs_scanned: int, files_seen: int, bytes_seen: int, top_level_done: int,
+                 top_level_total: int, current_path: str, elapsed: float):
+        self.dirs_scanned = dirs_scanned
+        self.files_seen = files_seen
+        self.bytes_seen = bytes_seen
+        self.top_level_done = top_level_done
+        self.top_level_total = top_level_total
+        self.current_path = current_path
+        self.elapsed = elapsed
+
+    @property
+    def percent(self) -> float:
+        """Share of top-level folders finished"""
+        if not self.top_level_total:
+            return 0.0
+        return self.top_level_done / self.top_level_total * 100
+
+    @property
+    def dirs_per_second(self) -> float:
+        return self.dirs_scanned / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> float:
+        """Seconds left, estimated from the rate top-level folders finish at"""
+        if not self.top_level_done or self.elapsed <= 0:
+            return 0.0
+        rate = self.top_level_done / self.elapsed
+        return (self.top_level_total - self.top_level_done) / rate
+
+
+class ParallelScanner:
+    """
+    Scan a tree with a pool of threads sharing one queue of directories
+
+    Every directory at any depth is a separate unit of work, so a single huge
+    subfolder is spread over all workers instead of being walked by one.
+    Sizes are rolled up into parents as soon as a whole subtree is finished.
+
+    If previous holds an earlier tree of the same path, directories whose
+    mtime and inode did not change are not listed again. Files rewritten in
+    place without any entry being added or removed are not picked up this way.
+
+    Pass a ScanProfile to record where the time goes, at a small cost.
+
+    A cancelled scan stops after the directories being listed and keeps
+    what it found: root then holds the finished part of the tree, complete
+    stays False, and using that tree as previous resumes the scan.
+    checkpoint() gives the same kind of tree while the scan runs on.
+    """
+
+    def __init__(self, path: str, max_workers: int = 4, previous: Optional[ScanNode] = None,
+                 profile: Optional[ScanProfile] = None):
+        self.path = path
+        self.max_workers = max(1, max_workers)
+        self.root = ScanNode(os.path.basename(os.path.normpath(path)) or path)
+        self.previous = previous
+        self.profile = profile
+
+        # Live counters for progress reporting
+        self.dirs_scanned = 0
+        self.files_seen = 0
+        self.bytes_seen = 0
+        self.top_level_total = 0
+        self.top_level_done = 0
+        self.current_path = ""
+        self.cancelled = False
+        self.complete = False
+        self.skipped = SkipReport()
+        self.largest_files = LargestFiles()
+        self.hard_links = HardLinks()
+
+        self.worker_stats = [WorkerStats() for _ in range(self.max_workers)]
+        self.start_time = 0.0
+        self.end_time = 0.0
+
+        # LIFO keeps the walk depth-first, which bounds the queue size
+        self._queue = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._pending = {}  # node -> own listing + unfinished child subtrees
+        self._parents = {}  # node -> parent node, only while the scan runs
+        self._top = {}  # node -> top-level folder it is in, only while the scan runs
+        self._live = {}  # top-level folder -> [size, files] found so far
+        self._old_nodes = {}  # node -> previous tree's node, for folders not listed yet
+        self._done = threading.Event()
+        self._threads = []
+
+    def start(self):
+        """Start the worker threads"""
+        try:
+            st = os.stat(self.path)
+            self.root.mtime, self.root.ino = st.st_mtime, st.st_ino
+            self.root.alloc = allocated_size(st)
+        except OSError:
+            pass
+
+        self.start_time = time.perf_counter()
+        self._pending[self.root] = 1
+        if self.previous is not None:
+            self._old_nodes[self.root] = self.previous
+        self._queue.put((self.root, self.path, self.previous))
+
+        for index in range(self.max_workers):
+            thread = threading.Thread(target=self._worker, args=(index,), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the scan to finish, returns True when it is done"""
+        return self._done.wait(timeout)
+
+    def scan(self) -> ScanNode:
+        """Run the whole scan and return the root node"""
+        self.start()
+        self.wait()
+        return self.root
+
+    def cancel(self):
+        """
+        Stop the scan once the directories being listed are done
+        Blocks until the workers have exited and the partial tree is rolled up
+        """
+        self.cancelled = True
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        if not self.complete:
+            self._keep_partial()
+            self._stop()
+
+    def elapsed(self) -> float:
+        """Wall time of the scan so far"""
+        if not self.start_time:
+            return 0.0
+        return (self.end_time or time.perf_counter()) - self.start_time
+
+    def progress(self) -> ScanProgress:
+        """Snapshot of the progress counters, cheap enough to poll every frame"""
+        with self._lock:
+            return ScanProgress(self.dirs_scanned, self.files_seen, self.bytes_seen,
+                                self.top_level_done, self.top_level_total,
+                                self.current_path, self.elapsed())
+
+    def utilization(self) -> List[float]:
+        """Fraction of the scan time each worker spent doing work"""
+        elapsed = self.elapsed()
+        if elapsed <= 0:
+            return [0.0] * self.max_workers
+        return [min(stats.busy_time / elapsed, 1.0) for stats in self.worker_stats]
+
+    @property
+    def dirs_reused(self) -> int:
+        """Directories whose listing was taken from the previous tree"""
+        return sum(stats.reused for stats in self.worker_stats)
+
+    def utilization_summary(self) -> str:
+        """One-line per-worker utilization for the progress panel"""
+        return "Workers: " + " ".join(f"{u * 100:.0f}%" for u in self.utilization())
+
+    def _stop(self):
+        self.end_time = time.perf_counter()
+        self._done.set()
+        for _ in self._threads:
+            self._queue.put(None)
+
+    def _worker(self, index: int):
+        stats = self.worker_stats[index]
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if self.cancelled:
+                continue
+
+            started = time.perf_counter()
+            node, path, old = item
+            self.current_path = path
+            reused = old is not None and node.same_listing(old)
+            children, old_children, entries = self._scan_directory(node, path, old, reused)
+            for child, old_child in zip(children, old_children):
+                if old_child is not None:
+                    self._old_nodes[child] = old_child
+            self._finish_directory(node, children)
+            self._old_nodes.pop(node, None)
+            for child, old_child in zip(children, old_children):
+                self._queue.put((child, os.path.join(path, child.name), old_child))
+
+            stats.dirs += 1
+            stats.reused += reused
+            stats.entries += entries
+            stats.busy_time += time.perf_counter() - started
+
+    def _scan_directory(self, node: ScanNode, path: str, old: Optional[ScanNode] = None,
+                        reuse: bool = False):
+        """
+        List one directory: sum its files and create nodes for its subfolders
+        With reuse set, the unchanged listing of old is used instead
+        Returns: (child_nodes, matching_old_children, entries_seen)
+        """
+        if reuse:
+            children = revisit_directory(node, path, old, self.skipped, self.profile)
+            entries = len(old.children)
+        else:
+            children, entries = list_directory(node, path, self.skipped, self.profile,
+                                               self.largest_files, self.hard_links)
+
+        if old is None or not old.children:
+            return children, [None] * len(children), entries
+
+        old_by_name = {child.name: child for child in old.children}
+        return children, [old_by_name.get(child.name) for child in children], entries
+
+    def _finish_directory(self, node: ScanNode, children: List[ScanNode]):
+        """Register the subfolders found in node and roll up finished subtrees"""
+        with self._lock:
+            started = time.perf_counter() if self.profile is not None else 0.0
+            self.dirs_scanned += 1
+            self.files_seen += node.files
+            self.bytes_seen += node.size
+
+            node.children = children
+            for child in children:
+                self._pending[child] = 1
+                self._parents[child] = node
+            if node is self.root:
+                self.top_level_total = len(children)
+                for child in children:
+                    self._top[child] = child
+                    self._live[child] = [0, 0]
+            else:
+                top = self._top[node]
+                for child in children:
+                    self._top[child] = top
+                self._add_live(top, node.size, node.files)
+
+            # Own listing is done, children subtrees are now outstanding
+            self._pending[node] += len(children) - 1
+            self._roll_up(node)
+            if self.profile is not None:
+                self.profile.add('aggregation', time.perf_counter() - started)
+
+    def _add_live(self, top: ScanNode, size: int, files: int):
+        totals = self._live[top]
+        totals[0] += size
+        totals[1] += files
+
+    def partial_results(self) -> List[Tuple[ScanNode, int, int]]:
+        """
+        Top-level folders with the size and file count found so far,
+        largest first, so results can be shown before the scan finishes
+        """
+        with self._lock:
+            rows = [(child, *self._live.get(child, (child.size, child.files)))
+                    for child in self.root.children]
+        rows.sort(key=lambda row: row[1], reverse=True)
+        return rows
+
+    def _roll_up(self, node: ScanNode):
+        """Add finished subtrees into their parents, must hold the lock"""
+        while self._pending[node] == 0:
+            del self._pending[node]
+            self._top.pop(node, None)
+            node.children.sort(key=lambda c: c.size, reverse=True)
+            parent = self._parents.pop(node, None)
+            if parent is None:
+                # After cancelling, subtrees still come back part-walked
+                self.complete = not self.cancelled
+                self._stop()
+                return
+
+            parent.add_subtree(node)
+            if parent is self.root:
+                self.top_level_done += 1
+            self._pending[parent] -= 1
+            node = parent
+
+    def checkpoint(self) -> Optional[ScanNode]:
+        """
+        Copy of the tree scanned so far, to save while a long scan runs on
+        Finished subtrees are shared, the scan does not change them any more;
+        the folders still in progress are copied and rolled up as on cancel.
+        Returns None once the scan is complete.
+        """
+        with self._lock:
+            if self.complete:
+                return None
+            return self._roll_up_partial(copy=True)
+
+    def _keep_partial(self):
+        """Roll up the finished part of the tree in place after cancelling"""
+        with self._lock:
+            self._roll_up_partial(copy=False)
+            self._pending.clear()
+            self._parents.clear()
+            self._top.clear()
+            self._old_nodes.clear()
+
+    def _roll_up_partial(self, copy: bool) -> ScanNode:
+        """
+        Add the finished part of every unfinished subtree into its parents,
+        must hold the lock. Folders not listed yet get inode 0, so a scan
+        resuming from the result lists them; on a refresh they keep the
+        previous tree's subtree until then.
+        Returns: the root of the rolled up tree
+        """
+        depths = {}
+        for node in self._pending:
+            depth, parent = 0, self._parents.get(node)
+            while parent is not None:
+                depth += 1
+                parent = self._parents.get(parent)
+            depths[node] = depth
+
+        # Deepest first, so every unfinished subfolder is done before its parent
+        parts = {}
+        for node in sorted(self._pending, key=depths.__getitem__, reverse=True):
+            # Listed folders without subfolders never stay pending
+            if not node.children:
+                part = ScanNode(node.name, mtime=node.mtime) if copy else node
+                old = self._old_nodes.get(node)
+                if old is not None:
+                    part.size, part.files, part.alloc = old.size, old.files, old.alloc
+                    part.types = list(old.types) if old.types is not None else None
+                    part.children = old.children
+                part.ino = 0
+            else:
+                if copy:
+                    part = ScanNode(node.name, node.size, node.files, node.mtime, node.ino,
+                                    [parts.get(child, child) for child in node.children],
+                                    list(node.types) if node.types is not None else None, node.alloc)
+                else:
+                    part = node
+                for child in node.children:
+                    if child in parts:
+                        part.add_subtree(parts[child])
+            part.children.sort(key=lambda c: c.size, reverse=True)
+            parts[node] = part
+        return parts.get(self.root, self.root)
+
+
+def _preorder(root: ScanNode) -> Tuple[List[ScanNode], List[int]]:
+    """Nodes of a tree in to_arrays() order, with each node's parent index (-1 for root)"""
+    nodes, parents = [], []
+    stack = [(root, -1)]
+    while stack:
+        node, parent = stack.pop()
+        index = len(nodes)
+        nodes.append(node)
+        parents.append(parent)
+        stack.extend((child, index) for child in reversed(node.children))
+    return nodes, parents
+
+
+# Set in each worker process of a ProcessScanner, shared with the coordinator
+_cancel_event = None
+
+
+def _init_worker(cancel_event):
+    global _cancel_event
+    _cancel_event = cancel_event
+    # Ctrl+C reaches the whole process group, the coordinator cancels through the event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _walk_subtree(path: str, profiled: bool = False, cancelled: Optional[Callable[[], bool]] = None):
+    """
+    Process pool task: walk a subtree and return it in ScanNode.to_arrays() form
+    Hard-linked files are returned as (dev, ino, node_index, alloc) so the
+    coordinator can count each one once across all subtrees. In a worker
+    process the walk stops early once the scan's cancel event is set.
+    Returns: (arrays, skip_counts, skip_examples, largest_files, hard_links,
+              pid, busy_time, profile_data)
+    """
+    started = time.perf_counter()
+    if cancelled is None and _cancel_event is not None:
+        cancelled = _cancel_event.is_set
+    skipped = SkipReport()
+    largest = LargestFiles()
+    links = HardLinks(record=True)
+    profile = ScanProfile() if profiled else None
+    root = scan_tree(path, skipped=skipped, profile=profile, largest=largest, links=links,
+                     cancelled=cancelled)
+    arrays = root.to_arrays()
+
+    index_of = {id(node): index for index, node in enumerate(_preorder(root)[0])}
+    hard_links = [(dev, ino, index_of[id(node)], alloc) for dev, ino, node, alloc in links.claimed]
+
+    profile_data = (profile.phases, profile.slowest) if profile is not None else None
+    return (arrays, skipped.counts, skipped.examples, largest.items(), hard_links, os.getpid(),
+            time.perf_counter() - started, profile_data)
+
+
+class ProcessScanner(ParallelScanner):
+    """
+    Scan a tree with a pool of worker processes
+
+    The coordinator lists the top of the tree until there are enough subtrees
+    to keep every process busy, then each process walks whole subtrees and
+    sends back compact per-directory arrays rather than per-file data.
+    This sidesteps the GIL when per-entry Python work is the bottleneck.
+    Cancelling sets an event the processes check between directories, and
+    the subtrees they return part-walked are kept like those of threads.
+    """
+
+    # Subtrees handed out per worker, more gives better balance on lopsided trees
+    SUBTREES_PER_WORKER = 8
+    MAX_SPLIT_DEPTH = 4
+
+    def __init__(self, path: str, max_workers: int = 4, profile: Optional[ScanProfile] = None):
+        super().__init__(path, max_workers, profile=profile)
+        self._worker_index = {}  # pid -> index into worker_stats
+        self._cancel_event = multiprocessing.Event()
+
+    def start(self):
+        """Start the coordinator thread"""
+        try:
+            st = os.stat(self.path)
+            self.root.mtime, self.root.ino = st.st_mtime, st.st_ino
+            self.root.alloc = allocated_size(st)
+        except OSError:
+            pass
+
+        self.start_time = time.perf_counter()
+        self._pending[self.root] = 1
+        threading.Thread(target=self._coordinate, daemon=True).start()
+
+    def cancel(self):
+        """Ask the coordinator and the worker processes to stop, wait() tells when they have"""
+        self.cancelled = True
+        self._cancel_event.set()
+
+    def _coordinate(self):
+        try:
+            self._split_and_walk()
+        finally:
+            # Cancelled or failed: keep what was found and let wait() return
+            if not self.complete:
+                self._keep_partial()
+                self._stop()
+
+    def _split_and_walk(self):
+        # Split the top of the tree breadth-first into enough subtrees
+        frontier = [(self.root, self.path)]
+        target = self.max_workers * self.SUBTREES_PER_WORKER
+        depth = 0
+        while frontier and len(frontier) < target and depth < self.MAX_SPLIT_DEPTH:
+            next_frontier = []
+            for node, path in frontier:
+                if self.cancelled:
+                    return
+                self.current_path = path
+                children, _, _ = self._scan_directory(node, path)
+                self._finish_directory(node, children)
+                next_frontier.extend((child, os.path.join(path, child.name)) for child in children)
+            frontier = next_frontier
+            depth += 1
+
+        if not frontier or self.cancelled:
+            return
+
+        profiled = self.profile is not None
+        with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                 initargs=(self._cancel_event,)) as executor:
+            future_to_subtree = {
+                executor.submit(_walk_subtree, path, profiled): (node, path)
+                for node, path in frontier
+            }
+
+            for future in as_completed(future_to_subtree):
+                if self.cancelled:
+                    # Subtrees not started are left unlisted, running ones
+                    # come back part-walked and are still attached
+                    for f in future_to_subtree:
+                        f.cancel()
+                if future.cancelled():
+                    continue
+
+                node, path = future_to_subtree[future]
+                self.current_path = path
+                try:
+                    result = future.result()
+                except BaseException:
+                    # Worker process died or was interrupted, walk this subtree here instead
+                    if self.cancelled:
+                        continue
+                    result = _walk_subtree(path, profiled, lambda: self.cancelled)
+                arrays, skip_counts, skip_examples, largest, hard_links, pid, busy_time, profile_data = result
+                self.skipped.merge(skip_counts, skip_examples)
+                self.largest_files.merge(largest)
+                if profile_data is not None:
+                    self.profile.merge(*profile_data)
+                self._record_worker(pid, len(arrays['name']), busy_time)
+                self._attach_subtree(node, arrays, hard_links)
+
+    def _record_worker(self, pid: int, dirs: int, busy_time: float):
+        index = self._worker_index.setdefault(pid, len(self._worker_index) % self.max_workers)
+        stats = self.worker_stats[index]
+        stats.dirs += dirs
+        stats.busy_time += busy_time
+
+    def _attach_subtree(self, node: ScanNode, arrays: Dict[str, list], hard_links: List[tuple]):
+        """Fill a frontier node with the subtree walked by a worker process"""
+        started = time.perf_counter()
+        subtree = ScanNode.from_arrays(arrays)
+
+        # Files also linked from a subtree attached earlier take no space here
+        nodes = parents = None
+        for dev, ino, index, alloc in hard_links:
+            if not self.hard_links.claim(dev, ino):
+                if nodes is None:
+                    nodes, parents = _preorder(subtree)
+                while index >= 0:
+                    nodes[index].alloc -= alloc
+                    index = parents[index]
+
+        with self._lock:
+            node.size = subtree.size
+            node.alloc = subtree.alloc
+            node.files = subtree.files
+            node.types = subtree.types
+            node.children = subtree.children
+            if not subtree.ino:
+                node.ino = 0  # cancelled before the worker listed it
+            self._add_live(self._top[node], subtree.size, subtree.files)
+            self.dirs_scanned += len(arrays['name'])
+            self.files_seen += subtree.files
+            self.bytes_seen += subtree.size
+
+            self._pending[node] -= 1
+            self._roll_up(node)
+        if self.profile is not None:
+            self.profile.add('aggregation', time.perf_counter() - started)
+
+
+def find_node(root: ScanNode, root_path: str, path: str) -> Optional[ScanNode]:
+    """Find the node for path inside the tree scanned from root_path"""
+    try:
+        relative = Path(path).relative_to(Path(root_path))
+    except ValueError:
+        return None
+
+    node = root
+    for part in relative.parts:
+        node = node.get_child(part)
+        if node is None:
+            return None
+    return node
+
+
+def replace_node(root: ScanNode, root_path: str, path: str, new_node: ScanNode) -> Optional[ScanNode]:
+    """
+    Swap the node for path inside the tree scanned from root_path with new_node
+    and adjust the rolled-up totals of every ancestor
+    Returns the replaced node, or None if path is not part of the tree
+    """
+    try:
+        relative = Path(path).relative_to(Path(root_path))
+    except ValueError:
+        return None
+    if not relative.parts:
+        return None
+
+    chain = [root]
+    for part in relative.parts[:-1]:
+        child = chain[-1].get_child(part)
+        if child is None:
+            return None
+        chain.append(child)
+
+    parent = chain[-1]
+    old_node = parent.get_child(relative.parts[-1])
+    if old_node is None:
+        return None
+
+    parent.children[parent.children.index(old_node)] = new_node
+    for ancestor in chain:
+        ancestor.add_subtree(old_node, -1)
+        ancestor.add_subtree(new_node)
+    parent.children.sort(key=lambda c: c.size, reverse=True)
+    return old_node
+
+
+def remove_node(root: ScanNode, root_path: str, path: str,
+                removed: Optional[ScanNode] = None) -> Optional[ScanNode]:
+    """
+    Take a deleted path out of the tree scanned from root_path and subtract
+    it from the rolled-up totals of every ancestor. Files are not nodes of
+    the tree, for a file pass removed, a node counting just that file.
+    Returns the subtracted node, or None if path is not part of the tree
+    """
+    try:
+        relative = Path(path).relative_to(Path(root_path))
+    except ValueError:
+        return None
+    if not relative.parts:
+        return None
+
+    chain = [root]
+    for part in relative.parts[:-1]:
+        child = chain[-1].get_child(part)
+        if child is None:
+            return None
+        chain.append(child)
+
+    parent = chain[-1]
+    if removed is None:
+        removed = parent.get_child(relative.parts[-1])
+        if removed is None:
+            return None
+        parent.children.remove(removed)
+
+    for ancestor in chain:
+        ancestor.add_subtree(removed, -1)
+        ancestor.children.sort(key=lambda c: c.size, reverse=True)
+    return removed
+
+
+class TreeDiff:
+    """
+    Changes between two scans of the same folder
+
+    totals has the size and file count change of every folder that
+    differs, by path relative to the scanned folder ('' for the folder
+    itself). local lists where the changes happened: folders whose own
+    files changed and folders added or removed as a whole, so the top
+    growers are not simply the ancestors of one big change.
+    """
+
+    def __init__(self):
+        self.totals = {}  # relative path -> (size change, file count change)
+        self.local = []  # (size change, relative path, 'changed' | 'added' | 'removed')
+        self.added = set()  # relative paths of folders that are new
+
+    def change(self, relative: str) -> Optional[Tuple[int, int]]:
+        """Size and file count change of a folder, None if it is inside a new folder"""
+        if relative in self.totals:
+            return self.totals[relative]
+        parent = os.path.dirname(relative)
+        while parent:
+            if parent in self.added:
+                return None
+            parent = os.path.dirname(parent)
+        return 0, 0
+
+    def growers(self, limit: int = 20) -> List[Tuple[int, str, str]]:
+        return heapq.nlargest(limit, (change for change in self.local if change[0] > 0))
+
+    def shrinkers(self, limit: int = 20) -> List[Tuple[int, str, str]]:
+        return heapq.nsmallest(limit, (change for change in self.local if change[0] < 0))
+
+
+def diff_trees(old: ScanNode, new: ScanNode) -> TreeDiff:
+    """
+    Compare two scans of one folder. Subtrees with the same rolled-up
+    totals are skipped without visiting them, so unchanged parts of a huge
+    tree cost one comparison; changes that cancel out inside such a
+    subtree are not listed.
+    """
+    diff = TreeDiff()
+    stack = [(old, new, '')]
+    while stack:
+        old_node, new_node, relative = stack.pop()
+        if (old_node.size, old_node.files, old_node.alloc) == (new_node.size, new_node.files, new_node.alloc):
+            continue
+        diff.totals[relative] = (new_node.size - old_node.size, new_node.files - old_node.files)
+
+        old_size, old_files, _ = old_node.own_totals()
+        new_size, new_files, _ = new_node.own_totals()
+        if new_size != old_size or new_files != old_files:
+            diff.local.append((new_size - old_size, relative, 'changed'))
+
+        old_children = {child.name: child for child in old_node.children}
+        for child in new_node.children:
+            child_path = os.path.join(relative, child.name) if relative else child.name
+            previous = old_children.pop(child.name, None)
+            if previous is not None:
+                stack.append((previous, child, child_path))
+            else:
+                diff.totals[child_path] = (child.size, child.files)
+                diff.local.append((child.size, child_path, 'added'))
+                diff.added.add(child_path)
+        for child in old_children.values():
+            child_path = os.path.join(relative, child.name) if relative else child.name
+            diff.totals[child_path] = (-child.size, -child.files)
+            diff.local.append((-child.size, child_path, 'removed'))
+    return diff
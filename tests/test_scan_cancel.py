@@ -0,0 +1,62 @@
+"""Cancelling a scan keeps a partial tree that a later scan resumes from"""
+import pytest
+
+from scanner import ParallelScanner, ProcessScanner, scan_tree
+
+
+@pytest.fixture(scope='module')
+def tree(tmp_path_factory):
+    # Two deep chains: with more workers than subtrees, every process walk
+    # is already running when the scan is cancelled
+    root = tmp_path_factory.mktemp('tree')
+    for top in range(2):
+        path = root / f"t{top}"
+        for depth in range(400):
+            path = path / f"d{depth}"
+        path.mkdir(parents=True)
+        while path != root:
+            (path / "f").write_bytes(b'x' * 10)
+            path = path.parent
+    return str(root)
+
+
+def totals(node):
+    result = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        result.append((node.name, node.size, node.files))
+        stack.extend(sorted(node.children, key=lambda c: c.name))
+    return result
+
+
+def cancel_mid_walk(scanner):
+    scanner.start()
+    # Cancel as soon as the top levels are listed and the subtrees handed out
+    while scanner.progress().dirs_scanned < 7 and not scanner.wait(0.001):
+        pass
+    scanner.cancel()
+    scanner.wait()
+
+
+@pytest.mark.parametrize('scanner_class', [ParallelScanner, ProcessScanner])
+def test_cancelled_scan_is_partial_and_resumes(tree, scanner_class):
+    full = scan_tree(tree)
+    scanner = scanner_class(tree, 4)
+    cancel_mid_walk(scanner)
+
+    assert not scanner.complete
+    assert scanner.root.files < full.files
+
+    resumed = ParallelScanner(tree, 4, scanner.root).scan()
+    assert totals(resumed) == totals(full)
+
+
+def test_cancelled_walk_marks_unlisted_folders(tree):
+    calls = []
+    partial = scan_tree(tree, cancelled=lambda: calls.append(1) or len(calls) > 20)
+    full = scan_tree(tree)
+
+    assert partial.files < full.files
+    resumed = ParallelScanner(tree, 2, partial).scan()
+    assert totals(resumed) == totals(full)
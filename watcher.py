@@ -0,0 +1,244 @@
+"""
+Filesystem change watching for Helium
+
+Watches the directories of the folder being browsed and reports which of
+them changed, in batches, so the cached tree and the table can be patched
+in place instead of rescanning. Uses inotify on Linux and falls back to
+polling directory mtimes everywhere else.
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Iterable, List, Set
+
+
+class DirectoryWatcher:
+    """
+    Base class: collects changed directories and hands them to on_change
+
+    Changes are coalesced: on_change is called from the watcher thread once
+    no new change arrived for `quiet` seconds, or at the latest `max_delay`
+    seconds after the first one, so a burst of writes becomes one batch.
+    """
+
+    def __init__(self, on_change: Callable[[List[str]], None], quiet: float = 0.5, max_delay: float = 3.0):
+        self.on_change = on_change
+        self.quiet = quiet
+        self.max_delay = max_delay
+
+        self._dirty = set()
+        self._first_change = 0.0
+        self._last_change = 0.0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def watch(self, paths: Iterable[str]):
+        """Start watching the given directories"""
+        raise NotImplementedError
+
+    def start(self):
+        """Start the watcher thread"""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop watching, pending changes are dropped"""
+        self._stopped.set()
+
+    def _wait_for_events(self, timeout: float):
+        """Block up to timeout seconds and mark any changed directories"""
+        raise NotImplementedError
+
+    def _mark(self, path: str):
+        now = time.monotonic()
+        with self._lock:
+            if not self._dirty:
+                self._first_change = now
+            self._dirty.add(path)
+            self._last_change = now
+
+    def _take_batch(self) -> Set[str]:
+        now = time.monotonic()
+        with self._lock:
+            if not self._dirty:
+                return set()
+            if now - self._last_change < self.quiet and now - self._first_change < self.max_delay:
+                return set()
+            batch, self._dirty = self._dirty, set()
+            return batch
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wait_for_events(min(self.quiet, 0.25))
+            batch = self._take_batch()
+            if batch and not self._stopped.is_set():
+                try:
+                    self.on_change(sorted(batch, key=lambda p: (p.count(os.sep), p)))
+                except Exception as e:
+                    print(f"Failed to apply changes: {e}")
+        self._close()
+
+    def _close(self):
+        pass
+
+
+class PollingWatcher(DirectoryWatcher):
+    """
+    Watch directories by checking their mtime and inode every few seconds
+    Only notices entries being added, removed or renamed, not files growing
+    """
+
+    def __init__(self, on_change: Callable[[List[str]], None], interval: float = 2.0, **kwargs):
+        super().__init__(on_change, **kwargs)
+        self.interval = interval
+        self._identity = {}  # path -> (mtime, inode)
+        self._next_poll = 0.0
+
+    def watch(self, paths: Iterable[str]):
+        for path in paths:
+            identity = self._stat(path)
+            if identity is not None:
+                with self._lock:
+                    self._identity[path] = identity
+
+    @staticmethod
+    def _stat(path: str):
+        try:
+            st = os.stat(path)
+            return st.st_mtime, st.st_ino
+        except OSError:
+            return None
+
+    def _wait_for_events(self, timeout: float):
+        self._stopped.wait(timeout)
+        if time.monotonic() < self._next_poll:
+            return
+        self._next_poll = time.monotonic() + self.interval
+
+        with self._lock:
+            watched = list(self._identity.items())
+        for path, identity in watched:
+            if self._stopped.is_set():
+                return
+            current = self._stat(path)
+            if current != identity:
+                with self._lock:
+                    if current is None:
+                        self._identity.pop(path, None)
+                    else:
+                        self._identity[path] = current
+                self._mark(path)
+
+
+class InotifyWatcher(DirectoryWatcher):
+    """Watch directories with Linux inotify, no polling involved"""
+
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ONLYDIR = 0x01000000
+    IN_ISDIR = 0x40000000
+
+    WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE |
+                  IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+    _EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self, on_change: Callable[[List[str]], None], max_watches: int = 8192, **kwargs):
+        super().__init__(on_change, **kwargs)
+        self.max_watches = max_watches
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._paths = {}  # watch descriptor -> directory path
+
+    def watch(self, paths: Iterable[str]):
+        for path in paths:
+            if len(self._paths) >= self.max_watches:
+                break
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), self.WATCH_MASK)
+            if wd >= 0:
+                with self._lock:
+                    self._paths[wd] = path
+
+    def _wait_for_events(self, timeout: float):
+        try:
+            readable, _, _ = select.select([self._fd], [], [], timeout)
+        except (OSError, ValueError):
+            return
+        if not readable:
+            return
+
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+
+        new_dirs = []
+        offset = 0
+        while offset + self._EVENT_HEADER.size <= len(data):
+            wd, mask, _, name_len = self._EVENT_HEADER.unpack_from(data, offset)
+            offset += self._EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + name_len].rstrip(b'\0'))
+            offset += name_len
+
+            if mask & self.IN_Q_OVERFLOW:
+                # Events were lost, every watched directory may have changed
+                with self._lock:
+                    watched = list(self._paths.values())
+                for path in watched:
+                    self._mark(path)
+                continue
+
+            path = self._paths.get(wd)
+            if path is None:
+                continue
+            if mask & self.IN_IGNORED:
+                with self._lock:
+                    self._paths.pop(wd, None)
+                continue
+            if mask & (self.IN_DELETE_SELF | self.IN_MOVE_SELF):
+                # The parent directory gets its own event for this
+                continue
+
+            self._mark(path)
+            if mask & self.IN_ISDIR and mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                new_dirs.append(os.path.join(path, name))
+
+        if new_dirs:
+            self.watch(new_dirs)
+
+    def _close(self):
+        try:
+            os.close(self._fd)
+        except OSError:
+            pass
+
+
+def create_watcher(on_change: Callable[[List[str]], None], **kwargs) -> DirectoryWatcher:
+    """Create the best watcher for this platform and start it"""
+    watcher = None
+    if sys.platform.startswith('linux'):
+        try:
+            watcher = InotifyWatcher(on_change, **kwargs)
+        except (OSError, AttributeError):
+            watcher = None
+    if watcher is None:
+        kwargs.pop('max_watches', None)
+        watcher = PollingWatcher(on_change, **kwargs)
+    watcher.start()
+    return watcher